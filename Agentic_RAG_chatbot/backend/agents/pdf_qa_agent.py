@@ -1,37 +1,32 @@
+import asyncio
+import os
 from backend.core.faiss_store import FAISSStore
-from backend.core.embeddings import get_query_embedding
 from backend.core.llm_clients import llm_client
+from backend.core.retrieval import HybridRetriever
+from backend.core.context_packer import ContextPacker, load_tokenizer
+from backend.core.scheduler import SchedulerBusy
+from backend.core.metrics import metrics
 
 
 class PDFQAAgent:
     """
     Agent responsible for answering user queries based on uploaded PDFs.
-    Uses FAISS for context retrieval and Ollama for generative response.
+    Uses BM25 + FAISS for context retrieval and Ollama for generative response.
     """
 
-    def __init__(self, faiss_store: FAISSStore):
+    def __init__(self, faiss_store: FAISSStore, context_packer: ContextPacker = None):
         self.faiss_store = faiss_store
         self.name = "PDF Q&A Agent"
-
-    async def process(self, query: str, k: int = 3) -> str:
-        """Process a question and return an answer using RAG pipeline."""
-
-        try:
-            # Embed the query
-            query_embedding = get_query_embedding(query)
-
-            # Retrieve relevant document chunks
-            relevant_chunks = self.faiss_store.search(query_embedding, k=k)
-
-            if not relevant_chunks:
-                return "I couldn't find any relevant context in the document."
-
-            # Construct context and prompts
-            context = "\n\n".join([
-                chunk["text"] if isinstance(chunk, dict) and "text" in chunk else str(chunk)
-                for chunk in relevant_chunks])
-
-            system_prompt = """You are a helpful AI assistant that answers questions based on a provided document context.
+        self.packer = context_packer or ContextPacker(faiss_store, load_tokenizer())
+        self.context_tokens = int(os.getenv("QA_CONTEXT_TOKENS", "768"))
+        self.retriever = HybridRetriever(
+            faiss_store,
+            mode=os.getenv("RETRIEVAL_MODE", "auto"),  # "dense", "hybrid", "auto"
+            candidates=int(os.getenv("RETRIEVAL_CANDIDATES", "20")),
+            lexical_confidence=float(os.getenv("BM25_CONFIDENCE", "0.8")),
+        )
+
+    SYSTEM_PROMPT = """You are a helpful AI assistant that answers questions based on a provided document context.
 You should:
 1. Understand the question deeply and carefully
 2. Keep responses short (2–3 sentences max)
@@ -41,22 +36,80 @@ You should:
 6. If context is ambiguous, clearly mention your reasoning
 7. Be natural and fluent like ChatGPT."""
 
-            prompt = f"""Based on the following context from the document, answer the question clearly and conversationally.
+    async def _build_prompt(self, query: str, k: int = 3, doc_ids=None, report: dict = None, filters=None):
+        """
+        Retrieve context for the query and build the user prompt (None if
+        nothing relevant). Returns (prompt, query embedding or None).
+        """
+        # Retrieve relevant document chunks: BM25 first, the embedding pass only when it is needed.
+        # Extra candidates replace chunks that packing drops as overlapping / near-duplicate.
+        relevant_chunks, query_embedding = await self.retriever.retrieve_with_embedding(query, k=2 * k,
+                                                                                         doc_ids=doc_ids,
+                                                                                         filters=filters)
+
+        # Construct context within the token budget, best chunks first; near-duplicate checks read stored
+        # vectors (possibly loading a shard from disk), so pack off the event loop
+        with metrics.span("prompt_build"):
+            packed = await asyncio.to_thread(self.packer.pack, relevant_chunks, self.context_tokens, max_chunks=k)
+        if not packed:
+            return None, query_embedding
+        print(f" Context packing: {packed.describe()}")
+        if report is not None:
+            report["context"] = packed.stats
+        context = packed.text
+
+        return f"""Based on the following context from the document, answer the question clearly and conversationally.
 
 Context:
 {context}
 
 Question: {query}
 
-Answer:"""
+Answer:""", query_embedding
+
+    @staticmethod
+    def _cache_scope(query: str, doc_ids, query_embedding, filters=None):
+        """
+        Semantic-cache arguments: reuse the retrieval embedding of the query;
+        a lexical-only retrieval (no embedding) skips the semantic lookup so no
+        forward pass runs before the answer. Filtered questions are answered
+        from a subset of the documents: exact-match caching only.
+        """
+        return {"doc_ids": doc_ids, "semantic_key": query, "semantic_embedding": query_embedding,
+                "semantic_lookup": query_embedding is not None, "semantic_cache": not filters}
+
+    async def process(self, query: str, k: int = 3, doc_ids=None, filters=None) -> str:
+        """
+        Process a question and return an answer using RAG pipeline.
+        filters restricts retrieval to chunks with matching metadata, e.g. {"page": [3, 4]}.
+        """
+
+        try:
+            prompt, query_embedding = await self._build_prompt(query, k, doc_ids, filters=filters)
+            if prompt is None:
+                return "I couldn't find any relevant context in the document."
 
             # Generate response from Ollama
-            response = await llm_client.generate(prompt=prompt, system_prompt=system_prompt)
+            response = await llm_client.generate(prompt=prompt, system_prompt=self.SYSTEM_PROMPT,
+                                                 **self._cache_scope(query, doc_ids, query_embedding, filters))
 
             if not response or len(response.strip()) == 0:
                 return "I couldn’t generate a response. Please rephrase your question."
 
             return response.strip()
 
+        except SchedulerBusy:
+            raise
         except Exception as e:
             return f"⚠️ Error: {str(e)}. Ensure Ollama is running via 'ollama serve' and a model like 'llama3' is pulled."
+
+    async def stream(self, query: str, k: int = 3, doc_ids=None, timings: dict = None, filters=None):
+        """Same RAG pipeline as process(), yielding answer tokens as they are generated."""
+        prompt, query_embedding = await self._build_prompt(query, k, doc_ids, report=timings, filters=filters)
+        if prompt is None:
+            yield "I couldn't find any relevant context in the document."
+            return
+        async for token in llm_client.generate_stream(prompt, self.SYSTEM_PROMPT, timings=timings,
+                                                      **self._cache_scope(query, doc_ids, query_embedding,
+                                                                          filters)):
+            yield token
@@ -2,14 +2,24 @@ from pptx import Presentation
 from pptx.util import Pt, Inches
 from pptx.dml.color import RGBColor
 from backend.core.llm_clients import llm_client
-from datetime import datetime
-import re, os
+from backend.core.deck_cache import DeckCache
+from backend.core.context_packer import ContextPacker, load_tokenizer
+from backend.core.metrics import metrics
+from io import BytesIO
+import asyncio, hashlib, re, os
 
 
 class PPTAgent:
-    def __init__(self, faiss_store):
+    def __init__(self, faiss_store, output_dir="outputs", context_packer=None):
         self.faiss_store = faiss_store
         self.name = "PPT Creation Agent"
+        self.packer = context_packer or ContextPacker(faiss_store, load_tokenizer())
+        self.context_tokens = int(os.getenv("PPT_CONTEXT_TOKENS", "750"))
+        self.deck_cache = DeckCache(
+            output_dir,
+            max_memory_bytes=int(os.getenv("PPT_CACHE_MEMORY_MB", "64")) * 1024 * 1024,
+            max_disk_bytes=int(os.getenv("PPT_OUTPUT_MAX_MB", "256")) * 1024 * 1024,
+        )
 
     def clean_text(self, text: str) -> str:
         """Remove markdown symbols and unwanted characters."""
@@ -19,9 +29,17 @@ class PPTAgent:
         text = re.sub(r"^[-*•]\s*", "", text.strip())
         return text.strip()
 
-    async def process(self, query: str, pdf_text: str) -> str:
-        """Generate a clean 3-slide PowerPoint presentation."""
-        
+    async def process(self, query: str, pdf_text: str, doc_ids=None) -> str:
+        """Generate a clean 3-slide PowerPoint presentation; returns the path of the deck in outputs/."""
+
+        # Same document(s) + same request (ignoring case/punctuation) -> same deck, no LLM call
+        doc_key = ",".join(sorted(doc_ids)) if doc_ids else hashlib.sha256(pdf_text.encode("utf-8")).hexdigest()
+        key = self.deck_cache.key(doc_key, query)
+        cached = await asyncio.to_thread(self.deck_cache.get, key)
+        if cached is not None:
+            print("⚡ Using cached deck")
+            return await asyncio.to_thread(self.deck_cache.ensure_file, key, cached)
+
         system_prompt =  """Create exactly 3 slides. Format strictly as:
 
 SLIDE 1
@@ -50,10 +68,14 @@ Slide 2 and 3 should summarize other key topics or insights from the PDF with ap
 Keep the output clean, short, and fast to generate."""
 
 
-        prompt = f"{query}\n\nDocument:\n{pdf_text[:3000]}"
+        with metrics.span("prompt_build"):
+            packed = await asyncio.to_thread(self.packer.pack_documents, doc_ids, self.context_tokens, pdf_text)
+        print(f" Context packing: {packed.describe()}")
+        prompt = f"{query}\n\nDocument:\n{packed.text}"
 
-        # Get AI response
-        response = await llm_client.generate(prompt, system_prompt)
+        # Get AI response; semantic matches are scoped to the documents (none without doc_ids)
+        response = await llm_client.generate(prompt, system_prompt, doc_ids=doc_ids, semantic_key=query,
+                                             priority="ppt", semantic_cache=bool(doc_ids))
 
         # Parse slides by splitting on "SLIDE"
         slide_parts = re.split(r'SLIDE\s+\d+', response, flags=re.IGNORECASE)
@@ -62,6 +84,13 @@ Keep the output clean, short, and fast to generate."""
         if len(slide_parts) < 3:
             return " Failed to generate 3 slides. Try again."
 
+        # python-pptx is CPU-bound and synchronous: build and serialize off the event loop
+        with metrics.span("ppt_render"):
+            data = await asyncio.to_thread(self._render, slide_parts)
+        return await asyncio.to_thread(self.deck_cache.put, key, data)
+
+    def _render(self, slide_parts) -> bytes:
+        """Build the deck from the parsed slide blocks and return the .pptx bytes."""
         prs = Presentation()
 
         # Create slides
@@ -114,10 +143,6 @@ Keep the output clean, short, and fast to generate."""
                     p.font.size = Pt(18)
                     p.font.color.rgb = RGBColor(0, 80, 80)
 
-        # Save
-        os.makedirs("outputs", exist_ok=True)
-        filename = f"generated_ppt_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pptx"
-        output_path = os.path.join("outputs", filename)
-        prs.save(output_path)
-
-        return output_path
+        buffer = BytesIO()
+        prs.save(buffer)
+        return buffer.getvalue()
@@ -1,31 +1,69 @@
-from backend.core.llm_clients import llm_client
+import asyncio
+import hashlib
+import os
+
+from backend.core.llm_clients import llm_client, OLLAMA_ERROR
+from backend.core.response_cache import ResponseCache
+from backend.core.scheduler import SchedulerBusy
+from backend.core.context_packer import ContextPacker, load_tokenizer
+from backend.core.metrics import metrics
+
+SUMMARY_MODES = ("auto", "single", "map_reduce")
+
 
 class SummarizationAgent:
-    def __init__(self, faiss_store):
+    """
+    Summarizes whole documents.
+    Documents that fit the style's token budget (after the context packer
+    drops overlapping / duplicate chunks) go to the LLM in one call. Longer
+    ones are summarized
+    map-reduce style: consecutive FAISS chunks are grouped into passages,
+    each passage is summarized concurrently (cached by passage hash, so
+    repeated summaries reuse the map results), and the partial summaries are
+    merged in rounds until they fit into one final prompt.
+    """
+
+    MAP_SYSTEM_PROMPT = """You summarize one passage of a longer document.
+Keep every key fact, name, number and conclusion. Write 2-4 plain sentences, no preamble."""
+
+    REDUCE_SYSTEM_PROMPT = """You merge partial summaries of consecutive parts of one document.
+Keep the key points in document order, drop repetition. Write one short plain paragraph, no preamble."""
+
+    def __init__(self, faiss_store, mode=None, map_chars=None, reduce_chars=None, map_concurrency=None,
+                 context_packer=None):
         self.faiss_store = faiss_store
         self.name = "Summarization Agent"
-    
-    async def process(self, query: str, full_text: str) -> str:
-        """Generate a summary of the document."""
-        
-        # Determine summary type from query
+        self.packer = context_packer or ContextPacker(faiss_store, load_tokenizer())
+        self.mode = mode or os.getenv("SUMMARY_MODE", "auto")
+        if self.mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode {self.mode!r}; expected one of {SUMMARY_MODES}")
+        self.map_chars = map_chars or int(os.getenv("SUMMARY_MAP_CHARS", "3000"))
+        self.reduce_chars = reduce_chars or int(os.getenv("SUMMARY_REDUCE_CHARS", "3000"))
+        self.map_concurrency = map_concurrency or int(os.getenv("SUMMARY_MAP_CONCURRENCY", "3"))
+        self.map_cache = ResponseCache(
+            os.getenv("LLM_CACHE_PATH", "llm_cache/responses.sqlite3"),
+            namespace=f"{llm_client.model_name}:summary-map",
+            max_memory_bytes=8 * 1024 * 1024,
+            ttl_seconds=30 * 24 * 3600,
+        )
+        self.stats = {"map_calls": 0, "map_cache_hits": 0, "reduce_calls": 0}
+
+    @staticmethod
+    def _summary_style(query: str):
+        """(summary_length, max_tokens of document context) for the requested summary style."""
         if "brief" in query.lower() or "short" in query.lower():
-            summary_length = "brief (3-4 sentences)"
-            max_chars = 3000
-        elif "detailed" in query.lower() or "comprehensive" in query.lower():
-            summary_length = "detailed and comprehensive"
-            max_chars = 8000
-        else:
-            summary_length = "moderate (1-2 paragraphs)"
-            max_chars = 5000
-        
-        # Truncate text if too long to avoid context limits
-        if len(full_text) > max_chars:
-            text_to_summarize = full_text[:max_chars] + "..."
-        else:
-            text_to_summarize = full_text
-        
-        system_prompt = f"""You are an expert at creating {summary_length} summaries. 
+            return "brief (3-4 sentences)", 750
+        if "detailed" in query.lower() or "comprehensive" in query.lower():
+            return "detailed and comprehensive", 2000
+        return "moderate (1-2 paragraphs)", 1250
+
+    def _build_prompts(self, query: str, text_to_summarize: str, source: str = "document"):
+        """Return (prompt, system_prompt) for the requested summary style; the text is already packed."""
+
+        # Determine summary type from query
+        summary_length, _ = self._summary_style(query)
+
+        system_prompt = f"""You are an expert at creating {summary_length} summaries.
 Your summaries should:
 1. Capture the main ideas and key points
 2. Be written in a clear, engaging style
@@ -33,19 +71,142 @@ Your summaries should:
 4. Highlight important themes, characters, or concepts
 5. Be coherent and well-structured"""
 
-        prompt = f"""Please provide a {summary_length} summary of the following document:
+        prompt = f"""Please provide a {summary_length} summary of the following {source}:
 
 {text_to_summarize}
 
 Summary:"""
+        return prompt, system_prompt
+
+    @staticmethod
+    def _cache_scope(query: str, doc_ids):
+        """
+        Semantic-cache arguments: match on the request text within the documents'
+        partition; without doc_ids only exact-match caching applies.
+        """
+        return {"doc_ids": doc_ids, "semantic_key": query, "semantic_cache": bool(doc_ids), "priority": "summarize"}
+
+    # -------------------- Map-Reduce -------------------- #
+    def _passages(self, doc_id):
+        """Consecutive chunks of a document joined into passages of about map_chars characters."""
+        passages, parts, size, prev = [], [], 0, None
+        for chunk in self.faiss_store.get_chunks(doc_id):
+            text = chunk.get("text", "")
+            # Chunks of the same page overlap; keep only the part after the previous chunk's end
+            if prev is not None and chunk.get("page") == prev.get("page") and "start" in chunk and "end" in prev:
+                text = text[max(0, prev["end"] - chunk["start"]):]
+            prev = chunk
+            if parts and size + len(text) > self.map_chars:
+                passages.append(" ".join(parts))
+                parts, size = [], 0
+            if text.strip():
+                parts.append(text.strip())
+                size += len(text)
+        if parts:
+            passages.append(" ".join(parts))
+        return passages
+
+    async def _generate(self, prompt: str, system_prompt: str, doc_ids):
+        """One map / reduce call; exact-match caching only, since passages of a document look alike."""
+        response = await llm_client.generate(prompt, system_prompt=system_prompt, doc_ids=doc_ids,
+                                             priority="summarize", semantic_cache=False)
+        if not response or response == OLLAMA_ERROR:
+            raise RuntimeError(response.strip() if response else "Empty summary from the LLM")
+        return response
 
+    async def _map(self, passages, doc_ids):
+        """Summarize every passage, at most map_concurrency at a time; cached by passage hash."""
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+
+        async def summarize(passage):
+            key = hashlib.sha256(passage.encode("utf-8")).hexdigest()
+            cached = self.map_cache.get(key)
+            if cached is not None:
+                self.stats["map_cache_hits"] += 1
+                return cached
+            async with semaphore:
+                self.stats["map_calls"] += 1
+                prompt = f"Summarize this passage:\n\n{passage}\n\nSummary:"
+                summary = await self._generate(prompt, self.MAP_SYSTEM_PROMPT, doc_ids)
+            self.map_cache.put(key, summary)
+            return summary
+
+        return await asyncio.gather(*(summarize(p) for p in passages))
+
+    async def _reduce(self, summaries, doc_ids):
+        """Merge partial summaries in rounds until they fit in reduce_chars; returns the joined text."""
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+
+        async def merge(group):
+            if len(group) == 1:
+                return group[0]
+            async with semaphore:
+                self.stats["reduce_calls"] += 1
+                prompt = "Summarize these consecutive partial summaries as one:\n\n" + "\n\n".join(group) + "\n\nSummary:"
+                return await self._generate(prompt, self.REDUCE_SYSTEM_PROMPT, doc_ids)
+
+        while len(summaries) > 1 and sum(len(s) for s in summaries) > self.reduce_chars:
+            groups, group, size = [], [], 0
+            for summary in summaries:
+                if group and size + len(summary) > self.reduce_chars:
+                    groups.append(group)
+                    group, size = [], 0
+                group.append(summary)
+                size += len(summary)
+            groups.append(group)
+            if len(groups) == len(summaries):  # every summary fills a group alone; merge pairwise instead
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            summaries = await asyncio.gather(*(merge(g) for g in groups))
+        return "\n\n".join(summaries)
+
+    async def _map_reduce_prompts(self, query: str, doc_ids):
+        """Run the map and intermediate reduce rounds; return the final (prompt, system_prompt)."""
+        summaries = []
+        for doc_id in doc_ids:
+            summaries.extend(await self._map(self._passages(doc_id), [doc_id]))
+        if not summaries:
+            raise RuntimeError("No indexed text to summarize")
+        merged = await self._reduce(summaries, doc_ids)
+        merged = self.packer.truncate(merged, self._summary_style(query)[1])
+        return self._build_prompts(query, merged, source="section summaries of a document, in order")
+
+    # -------------------- Public API -------------------- #
+    async def _prompts_for(self, query: str, full_text: str, doc_ids, report: dict = None):
+        """Single call when the packed document fits the budget (or mode=single), map-reduce otherwise."""
+        if doc_ids and self.mode == "map_reduce":
+            return await self._map_reduce_prompts(query, doc_ids)
+
+        budget = self._summary_style(query)[1]
+        with metrics.span("prompt_build"):
+            packed = await asyncio.to_thread(self.packer.pack_documents, doc_ids, budget, full_text)
+        if doc_ids and self.mode == "auto" and packed.stats.get("over_budget"):
+            return await self._map_reduce_prompts(query, doc_ids)
+
+        print(f" Context packing: {packed.describe()}")
+        if report is not None:
+            report["context"] = packed.stats
+        return self._build_prompts(query, packed.text)
+
+    async def process(self, query: str, full_text: str, doc_ids=None) -> str:
+        """Generate a summary of the document."""
         try:
-            response = await llm_client.generate(prompt, system_prompt=system_prompt)
-            
+            prompt, system_prompt = await self._prompts_for(query, full_text, doc_ids)
+            response = await llm_client.generate(prompt, system_prompt=system_prompt,
+                                                 **self._cache_scope(query, doc_ids))
+
             if not response:
                 return "I apologize, but I couldn't generate a summary. Please try again."
-            
+
             return response
-        
+
+        except SchedulerBusy:
+            raise
         except Exception as e:
-            return f"Error generating summary: {str(e)}. Make sure Ollama is running."
\ No newline at end of file
+            return f"Error generating summary: {str(e)}. Make sure Ollama is running."
+
+    async def stream(self, query: str, full_text: str, timings: dict = None, doc_ids=None):
+        """Same as process(), yielding summary tokens as they are generated (map rounds run first)."""
+        prompt, system_prompt = await self._prompts_for(query, full_text, doc_ids, report=timings)
+        async for token in llm_client.generate_stream(prompt, system_prompt, timings=timings,
+                                                      **self._cache_scope(query, doc_ids)):
+            yield token
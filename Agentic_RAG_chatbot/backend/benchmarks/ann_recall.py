@@ -0,0 +1,139 @@
+"""
+Recall-vs-latency-vs-memory report for the FAISSStore index types.
+
+Builds every index type over the same vectors, sweeps nprobe / efSearch
+(and the PQ code size), and compares recall@k, per-query latency and index
+bytes per vector against the exact flat index. Lossy types are measured
+with and without re-ranking their candidates by the exact vectors.
+
+    python -m backend.benchmarks.ann_recall --n 50000
+    python -m backend.benchmarks.ann_recall --shard faiss_index/<doc_id> --json report.json
+    python -m backend.benchmarks.ann_recall --pq-m 16 48 --rerank 0 2 8
+"""
+import argparse
+import json
+import time
+import numpy as np
+
+from backend.core.faiss_store import (LOSSY_INDEX_TYPES, build_index, bytes_per_vector, index_memory_bytes, rerank,
+                                      search_params)
+from backend.core.record_store import RecordStore
+
+NPROBE_SWEEP = (1, 4, 16, 64)
+EF_SEARCH_SWEEP = (16, 32, 64, 128)
+PQ_M_SWEEP = (16, 32, 48, 96)
+RERANK_FACTORS = (0, 4)
+
+
+def synthetic_vectors(n, dim, seed=0):
+    """Clustered, L2-normalized vectors that roughly mimic sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 500), dim)).astype("float32")
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def timed_search(index, queries, k, params=None, vectors=None, rerank_factor=0):
+    """
+    Search one query at a time, as the API does; returns (ids, mean ms/query).
+    With rerank_factor, rerank_factor * k candidates are re-scored against vectors.
+    """
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, q in enumerate(queries):
+        if rerank_factor:
+            _, I = index.search(q[None, :], k * rerank_factor, params=params)
+            _, I = rerank(vectors, q[None, :], I, k)
+        else:
+            _, I = index.search(q[None, :], k, params=params)
+        ids[i] = I[0]
+    return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def _row(index_type, label, index, build_s, recall, ms, rerank_factor=0):
+    return {"index_type": index_type, "param": label, "rerank": rerank_factor or None, "recall": recall,
+            "ms_per_query": ms, "build_s": build_s, "memory_mb": index_memory_bytes(index) / 2**20,
+            "bytes_per_vector": round(bytes_per_vector(index), 1)}
+
+
+def run_report(vectors, queries, k=10, index_types=("ivf_flat", "ivf_pq", "hnsw", "sq8", "fp16", "pq"),
+               pq_m_sweep=PQ_M_SWEEP, rerank_factors=RERANK_FACTORS):
+    rows = []
+    dim = vectors.shape[1]
+
+    start = time.perf_counter()
+    flat = build_index(vectors, "flat")
+    build_s = time.perf_counter() - start
+    truth, flat_ms = timed_search(flat, queries, k)
+    rows.append(_row("flat", None, flat, build_s, 1.0, flat_ms))
+
+    for index_type in index_types:
+        if index_type == "pq":
+            variants = [(m, f"M={m}") for m in pq_m_sweep if dim % m == 0]
+        else:
+            variants = [(None, None)]
+        for pq_m, variant in variants:
+            start = time.perf_counter()
+            index = build_index(vectors, index_type, pq_m=pq_m)
+            build_s = time.perf_counter() - start
+            if index_type == "hnsw":
+                sweep = [(search_params(index, ef_search=v), f"efSearch={v}") for v in EF_SEARCH_SWEEP]
+            elif index_type.startswith("ivf"):
+                sweep = [(search_params(index, nprobe=v), f"nprobe={v}") for v in NPROBE_SWEEP]
+            else:
+                sweep = [(None, variant)]
+            factors = rerank_factors if index_type in LOSSY_INDEX_TYPES else (0,)
+            for params, label in sweep:
+                for factor in factors:
+                    found, ms = timed_search(index, queries, k, params, vectors, factor)
+                    rows.append(_row(index_type, label, index, build_s, recall_at_k(found, truth), ms, factor))
+    return rows
+
+
+def print_report(rows, k):
+    print(f"{'index':<10} {'param':<13} {'rerank':>6} {'recall@' + str(k):>9} {'ms/query':>9} {'speedup':>8} "
+          f"{'build s':>8} {'MB':>8} {'B/vector':>9}")
+    flat_ms = rows[0]["ms_per_query"]
+    for r in rows:
+        rerank_label = f"x{r['rerank']}" if r["rerank"] else "-"
+        print(f"{r['index_type']:<10} {r['param'] or '-':<13} {rerank_label:>6} {r['recall']:>9.3f} "
+              f"{r['ms_per_query']:>9.3f} {flat_ms / r['ms_per_query']:>7.1f}x {r['build_s']:>8.2f} "
+              f"{r['memory_mb']:>8.1f} {r['bytes_per_vector']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50_000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="synthetic vector dimension")
+    parser.add_argument("--shard", help="use the vectors of an existing shard directory instead")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, nargs="+", default=list(PQ_M_SWEEP), help="PQ code sizes (bytes/vector)")
+    parser.add_argument("--rerank", type=int, nargs="+", default=list(RERANK_FACTORS),
+                        help="re-rank factors for lossy types (0: compressed distances only)")
+    parser.add_argument("--json", help="also write the rows to this JSON file")
+    args = parser.parse_args()
+
+    if args.shard:
+        vectors = np.array(RecordStore(args.shard).vectors())
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype("float32")
+
+    rows = run_report(vectors, queries, k=args.k, pq_m_sweep=args.pq_m, rerank_factors=args.rerank)
+    print_report(rows, args.k)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"n": len(vectors), "dim": vectors.shape[1], "k": args.k, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Throughput of the span-based chunker against the old newline chunker.
+
+    python -m backend.benchmarks.chunker_throughput --mb 20
+    python -m backend.benchmarks.chunker_throughput --pdf uploads/what_is_science.pdf
+    python -m backend.benchmarks.chunker_throughput --tokenizer sentence-transformers/all-MiniLM-L6-v2
+
+Reports MB/s, chunk counts and how well chunks fill the token budget
+(measured with the same tokenizer used for packing).
+"""
+import argparse
+import json
+import random
+import time
+import numpy as np
+
+from backend.core.chunking import chunk_spans, token_offsets
+
+WORDS = ("science model energy atom theory data evidence experiment result study "
+         "cell forest queen mirror apple dwarf castle story page chapter report").split()
+
+
+def synthetic_text(mb, seed=0):
+    """Paragraphs of short sentences with PDF-like hard line breaks."""
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < mb * 2**20:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + ". "
+        if rng.random() < 0.3:
+            sentence += "\n"
+        if rng.random() < 0.05:
+            sentence += "\n"
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+
+def legacy_chunk_text(text, max_chars=800):
+    """The previous chunker, kept here as the baseline."""
+    paragraphs = text.split("\n")
+    chunks, current_chunk = [], ""
+    for para in paragraphs:
+        if len(current_chunk) + len(para) < max_chars:
+            current_chunk += para + " "
+        else:
+            chunks.append(current_chunk.strip())
+            current_chunk = para
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+
+def token_counts(text, spans, offsets):
+    starts = offsets[:, 0]
+    return np.array([np.searchsorted(starts, e) - np.searchsorted(starts, s) for s, e in spans])
+
+
+def run(text, tokenizer=None, max_tokens=254, overlap_tokens=32, repeat=3):
+    mb = len(text.encode("utf-8")) / 2**20
+    rows = []
+
+    best = min(_timed(lambda: legacy_chunk_text(text)) for _ in range(repeat))
+    legacy = legacy_chunk_text(text)
+    legacy_tokens = np.array([len(token_offsets(c, tokenizer)) for c in legacy[:2000]])
+    rows.append(_row("legacy newline (800 chars)", mb, best, len(legacy), legacy_tokens, max_tokens))
+
+    best_tok = min(_timed(lambda: token_offsets(text, tokenizer)) for _ in range(repeat))
+    offsets = token_offsets(text, tokenizer)
+    for sentence_aware in (False, True):
+        best = min(_timed(lambda: chunk_spans(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens,
+                                             sentence_aware=sentence_aware, offsets=offsets)) for _ in range(repeat))
+        spans = chunk_spans(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens,
+                            sentence_aware=sentence_aware, offsets=offsets)
+        label = f"spans {'sentence-aware' if sentence_aware else 'token-only'}"
+        rows.append(_row(label, mb, best + best_tok, len(spans), token_counts(text, spans, offsets), max_tokens,
+                         tokenize_s=best_tok))
+    return rows
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _row(label, mb, seconds, n_chunks, tokens, max_tokens, tokenize_s=None):
+    return {
+        "chunker": label,
+        "seconds": round(seconds, 4),
+        "tokenize_seconds": round(tokenize_s, 4) if tokenize_s is not None else None,
+        "mb_per_s": round(mb / seconds, 2) if seconds else None,
+        "chunks": n_chunks,
+        "mean_fill": round(float(tokens.mean()) / max_tokens, 3) if len(tokens) else 0.0,
+        "over_budget": int((tokens > max_tokens).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=10, help="size of the synthetic document")
+    parser.add_argument("--pdf", help="chunk the text of this PDF instead")
+    parser.add_argument("--tokenizer", help="HF tokenizer name (default: regex approximation)")
+    parser.add_argument("--max-tokens", type=int, default=254)
+    parser.add_argument("--overlap", type=int, default=32)
+    parser.add_argument("--json", help="also write the rows to this JSON file")
+    args = parser.parse_args()
+
+    if args.pdf:
+        from backend.core.pdf_utils import extract_text_from_pdf
+        text = extract_text_from_pdf(args.pdf)
+    else:
+        text = synthetic_text(args.mb)
+    tokenizer = None
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+
+    rows = run(text, tokenizer, args.max_tokens, args.overlap)
+    print(f"{len(text) / 2**20:.1f} MB, budget {args.max_tokens} tokens, overlap {args.overlap}")
+    print(f"{'chunker':<28} {'seconds':>8} {'MB/s':>8} {'chunks':>8} {'fill':>6} {'over':>6}")
+    for r in rows:
+        print(f"{r['chunker']:<28} {r['seconds']:>8.3f} {r['mb_per_s']:>8.2f} {r['chunks']:>8} "
+              f"{r['mean_fill']:>6.2f} {r['over_budget']:>6}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
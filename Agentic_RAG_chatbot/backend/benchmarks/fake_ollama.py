@@ -0,0 +1,158 @@
+"""
+Local stand-in for Ollama's /api/generate, for offline benchmarks.
+
+Streams NDJSON tokens like `ollama serve` after a fixed time-to-first-token,
+at a fixed token rate. Point the backend at it with OLLAMA_URL:
+
+    python -m backend.benchmarks.fake_ollama --port 11435 --ttft-ms 150 --tokens-per-s 40
+    OLLAMA_URL=http://127.0.0.1:11435 uvicorn backend.main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("the document explains that energy evidence and careful study lead to a clear result "
+         "while the story follows the queen the mirror and the seven dwarfs").split()
+
+
+class FakeOllama:
+    """
+    Threaded HTTP server speaking just enough of the Ollama API (/api/generate,
+    /api/tags). Each request waits ttft_ms, then streams num_predict tokens
+    (the request's value, else `tokens`) at tokens_per_s (0: as fast as possible).
+    Usable as a context manager that serves on a background thread.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, ttft_ms=100.0, tokens_per_s=50.0, tokens=64, error_rate=0.0, seed=0):
+        self.ttft_ms = ttft_ms
+        self.tokens_per_s = tokens_per_s
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "tokens": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _fail(self):
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _chunk(self, obj):
+                data = (json.dumps(obj) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._json(200, {"models": [{"name": "fake"}]})
+                else:
+                    self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path != "/api/generate":
+                    self._json(404, {"error": "not found"})
+                    return
+                fake._count("requests")
+                request = json.loads(body or b"{}")
+                if fake._fail():
+                    fake._count("errors")
+                    self._json(500, {"error": "injected failure"})
+                    return
+
+                n = int(request.get("num_predict") or request.get("options", {}).get("num_predict") or fake.tokens)
+                start = time.perf_counter()
+                time.sleep(fake.ttft_ms / 1000)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i in range(n):
+                        if fake.tokens_per_s and i:
+                            time.sleep(1 / fake.tokens_per_s)
+                        self._chunk({"model": request.get("model"), "response": WORDS[i % len(WORDS)] + " ",
+                                     "done": False})
+                    self._chunk({"model": request.get("model"), "response": "", "done": True, "eval_count": n,
+                                 "total_duration": int((time.perf_counter() - start) * 1e9)})
+                    self.wfile.write(b"0\r\n\r\n")
+                    fake._count("tokens", n)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client went away mid-stream
+
+        return Handler
+
+    # -------------------- Lifecycle -------------------- #
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft-ms", type=float, default=100.0, help="delay before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=50.0, help="token rate (0: unthrottled)")
+    parser.add_argument("--tokens", type=int, default=64, help="tokens per response when num_predict is unset")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    server = FakeOllama(args.host, args.port, args.ttft_ms, args.tokens_per_s, args.tokens, args.error_rate)
+    print(f"Fake Ollama on {server.url} (ttft {args.ttft_ms} ms, {args.tokens_per_s} tokens/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+End-to-end benchmarks of the backend against a local fake Ollama.
+
+Runs the FastAPI app in-process (httpx ASGI transport) inside a scratch
+working directory, so indexes and caches start cold and the real uploads/,
+faiss_index/ and llm_cache/ are never touched. Generation goes to
+backend.benchmarks.fake_ollama through OLLAMA_URL; embeddings use the real
+sentence-transformers model.
+
+    python -m backend.benchmarks.rag_bench --json bench.json
+    python -m backend.benchmarks.rag_bench --scenarios chat --clients 1 8 32 --ttft-ms 200 --tokens-per-s 30
+    python -m backend.benchmarks.rag_bench --scenarios ingest --docs 4 --pages 200
+
+Scenarios:
+    ingest  upload a synthetic corpus; pages/s and chunks/s overall and per stage
+    chat    /chat Q&A latency p50/p95/p99 under N concurrent clients (distinct questions)
+    cache   latency of a cold question vs. exact repeats vs. paraphrases, with hit counts
+
+Compare the JSON of two commits to spot regressions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+from backend.benchmarks.chunker_throughput import WORDS
+from backend.benchmarks.fake_ollama import FakeOllama
+from backend.benchmarks.synthetic_pdf import write_corpus
+
+SCENARIOS = ("ingest", "chat", "cache")
+PARAPHRASES = ("Quick question. ", "Please tell me: ", "I was wondering: ", "Can you check this? ", "One more thing: ")
+
+
+def latency_summary(seconds):
+    if not seconds:
+        return None
+    ms = np.asarray(seconds) * 1000
+    return {
+        "n": len(ms),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def cache_counters(stats):
+    """Flat hit / upstream counters from /llm/stats."""
+    response = stats["response_cache"]
+    semantic = stats["semantic_cache"] or {}
+    return {
+        "exact_hits": response["memory_hits"] + response["disk_hits"],
+        "semantic_hits": semantic.get("hits", 0),
+        "coalesced": stats["coalescing"]["coalesced"],
+        "upstream": stats["coalescing"]["upstream"],
+    }
+
+
+async def counters(client):
+    return cache_counters((await client.get("/llm/stats")).json())
+
+
+def delta(before, after):
+    return {k: after[k] - before[k] for k in after}
+
+
+def question(rng, tag):
+    """A distinct Q&A question (random words plus a unique tag, so neither cache can answer it)."""
+    return f"What does the document say about {' '.join(rng.sample(WORDS, 4))} ({tag})?"
+
+
+# -------------------- Scenarios -------------------- #
+async def run_ingest(client, paths, poll_s=0.05):
+    """Upload every PDF at once and wait for all ingestion jobs."""
+    start = time.perf_counter()
+    jobs, doc_ids = [], []
+    for path in paths:
+        with open(path, "rb") as f:
+            response = await client.post("/upload-pdf", files={"file": (os.path.basename(path), f.read(),
+                                                                        "application/pdf")})
+        response.raise_for_status()
+        body = response.json()
+        doc_ids.append(body["doc_id"])
+        if "job_id" in body:
+            jobs.append(body["job_id"])
+
+    finished = []
+    while jobs:
+        await asyncio.sleep(poll_s)
+        for job_id in list(jobs):
+            job = (await client.get(f"/ingest/{job_id}")).json()
+            if job["status"] in ("done", "failed"):
+                finished.append(job)
+                jobs.remove(job_id)
+    wall = time.perf_counter() - start
+
+    pages = sum(j["stages"]["extract"]["items"] for j in finished)
+    chunks = sum(j["stages"]["index"]["items"] for j in finished)
+    stages = {name: round(float(np.mean([j["stages"][name]["throughput_per_s"] for j in finished])), 2)
+              for name in ("extract", "chunk", "embed", "index")} if finished else {}
+    return doc_ids, {
+        "docs": len(paths),
+        "failed": sum(j["status"] == "failed" for j in finished),
+        "pages": pages,
+        "chunks": chunks,
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(pages / wall, 2),
+        "chunks_per_s": round(chunks / wall, 2),
+        "stage_throughput_per_s": stages,
+    }
+
+
+async def run_chat(make_client, doc_ids, clients, requests_per_client, seed=0):
+    """clients concurrent sessions, each sending requests_per_client distinct questions back to back."""
+    rng = random.Random(seed)
+    questions = [[question(rng, f"chat x{clients} client {c} question {i}") for i in range(requests_per_client)]
+                 for c in range(clients)]
+    latencies, statuses = [], {}
+
+    async def session(qs):
+        async with make_client() as client:
+            for q in qs:
+                start = time.perf_counter()
+                response = await client.post("/chat", json={"message": q, "agent_type": "qa", "doc_ids": doc_ids})
+                elapsed = time.perf_counter() - start
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    latencies.append(elapsed)
+
+    async with make_client() as client:
+        before = await counters(client)
+        start = time.perf_counter()
+        await asyncio.gather(*(session(qs) for qs in questions))
+        wall = time.perf_counter() - start
+        after = await counters(client)
+
+    return {
+        "clients": clients,
+        "requests": clients * requests_per_client,
+        "ok": len(latencies),
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "latency": latency_summary(latencies),
+        "cache": delta(before, after),
+    }
+
+
+async def run_cache(make_client, doc_ids, questions=5, repeats=5, seed=1):
+    """
+    Per question: one cold request, `repeats` exact repeats (response cache)
+    and `repeats` paraphrases (semantic cache, if it fires at the threshold;
+    paraphrases repeat once repeats exceeds len(PARAPHRASES)).
+    """
+    rng = random.Random(seed)
+    paths = {"cold": [], "exact": [], "paraphrase": []}
+    async with make_client() as client:
+        before = await counters(client)
+
+        async def ask(path, message):
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"message": message, "agent_type": "qa", "doc_ids": doc_ids})
+            response.raise_for_status()
+            paths[path].append(time.perf_counter() - start)
+
+        for i in range(questions):
+            q = question(rng, f"cache question {i}")
+            await ask("cold", q)
+            for _ in range(repeats):
+                await ask("exact", q)
+            for r in range(repeats):
+                await ask("paraphrase", PARAPHRASES[r % len(PARAPHRASES)] + q.lower())
+        after = await counters(client)
+
+    return {
+        "questions": questions,
+        "repeats": repeats,
+        "latency": {path: latency_summary(samples) for path, samples in paths.items()},
+        "cache": delta(before, after),
+    }
+
+
+# -------------------- Driver -------------------- #
+async def run(args, corpus):
+    import httpx
+    from backend import main as server  # imported here: reads OLLAMA_URL and creates its dirs in the cwd
+
+    def make_client():
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                 timeout=None)
+
+    results = {}
+    async with server.lifespan(server.app):
+        async with make_client() as client:
+            doc_ids, ingest = await run_ingest(client, corpus)
+        if "ingest" in args.scenarios:
+            results["ingest"] = ingest
+        if "chat" in args.scenarios:
+            results["chat"] = [await run_chat(make_client, doc_ids, n, args.requests, seed=n) for n in args.clients]
+        if "cache" in args.scenarios:
+            results["cache"] = await run_cache(make_client, doc_ids, args.cache_questions, args.cache_repeats)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results):
+    if "ingest" in results:
+        r = results["ingest"]
+        print(f"ingest: {r['docs']} docs, {r['pages']} pages, {r['chunks']} chunks in {r['wall_s']} s "
+              f"-> {r['pages_per_s']} pages/s, {r['chunks_per_s']} chunks/s  stages {r['stage_throughput_per_s']}")
+    for r in results.get("chat", []):
+        lat = r["latency"] or {}
+        print(f"chat x{r['clients']:<3} {r['throughput_rps']:>7.2f} req/s  p50 {lat.get('p50_ms')} ms  "
+              f"p95 {lat.get('p95_ms')} ms  p99 {lat.get('p99_ms')} ms  status {r['status_codes']}  cache {r['cache']}")
+    if "cache" in results:
+        r = results["cache"]
+        for path, lat in r["latency"].items():
+            print(f"cache {path:<10} p50 {lat['p50_ms']} ms  p95 {lat['p95_ms']} ms")
+        print(f"cache counters {r['cache']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--docs", type=int, default=2, help="synthetic PDFs to ingest")
+    parser.add_argument("--pages", type=int, default=50, help="pages per synthetic PDF")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16], help="concurrent /chat clients")
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--cache-questions", type=int, default=5)
+    parser.add_argument("--cache-repeats", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=100.0, help="fake Ollama time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=50.0, help="fake Ollama token rate (0: unthrottled)")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temporary one)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="rag_bench_"))
+    os.makedirs(os.path.join(workdir, "outputs"), exist_ok=True)
+    os.chdir(workdir)
+    corpus = write_corpus(os.path.join(workdir, "corpus"), args.docs, args.pages)
+
+    with FakeOllama(ttft_ms=args.ttft_ms, tokens_per_s=args.tokens_per_s) as fake:
+        os.environ["OLLAMA_URL"] = fake.url
+        started = time.time()
+        results = asyncio.run(run(args, corpus))
+        fake_stats = dict(fake.stats)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "workdir": workdir,
+            "args": {k: v for k, v in vars(args).items() if k not in ("json", "workdir")},
+            "fake_ollama": fake_stats,
+        },
+        "results": results,
+    }
+    print_report(results)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Synthetic PDF corpora for the ingestion benchmarks.
+
+Writes text-only PDFs (Helvetica, one content stream per page) without any
+PDF library, so corpora of any size can be generated offline:
+
+    python -m backend.benchmarks.synthetic_pdf --docs 5 --pages 200 --out bench_corpus/
+"""
+import argparse
+import os
+import random
+
+from backend.benchmarks.chunker_throughput import WORDS
+
+LINES_PER_PAGE = 45
+CHARS_PER_LINE = 90
+
+
+def page_lines(rng, lines=LINES_PER_PAGE, width=CHARS_PER_LINE):
+    """Wrapped lines of short random sentences, with an occasional blank line between paragraphs."""
+    out, line = [], ""
+    while len(out) < lines:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+        for word in sentence.split():
+            if len(line) + len(word) + 1 > width:
+                out.append(line)
+                line = ""
+            line = f"{line} {word}" if line else word
+        if rng.random() < 0.15:
+            out.extend([line, ""])
+            line = ""
+    return out[:lines]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_bytes(pages):
+    """A minimal PDF with one page per list of text lines."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+        ops += [f"({_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_refs.append(len(objects))
+    kids = " ".join(f"{n} 0 R" for n in page_refs).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def synthetic_pdf(pages, seed=0):
+    rng = random.Random(seed)
+    return pdf_bytes([page_lines(rng) for _ in range(pages)])
+
+
+def write_corpus(directory, docs, pages, seed=0):
+    """Write docs PDFs of the given page count; returns their paths. Each document has distinct bytes."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(docs):
+        path = os.path.join(directory, f"synthetic_{pages}p_{seed + i}.pdf")
+        with open(path, "wb") as f:
+            f.write(synthetic_pdf(pages, seed=seed + i))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_corpus")
+    args = parser.parse_args()
+
+    for path in write_corpus(args.out, args.docs, args.pages, args.seed):
+        print(f"{path} ({os.path.getsize(path) / 2**10:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
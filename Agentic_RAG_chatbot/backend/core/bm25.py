@@ -0,0 +1,123 @@
+import json
+import math
+import os
+import re
+import shutil
+from collections import Counter
+
+import numpy as np
+
+_TERM = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TERM.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunks of one document.
+    Posting lists are stored as flat arrays (chunk ids as uint32, term
+    frequencies as uint16) with per-term offsets; save() writes them as .npy
+    files that load() memory-maps, so a loaded index costs little more than
+    its vocabulary dict.
+    """
+
+    FILES = ("offsets.npy", "doc_ids.npy", "tfs.npy", "doc_len.npy")
+
+    def __init__(self, terms, offsets, doc_ids, tfs, doc_len, k1=1.2, b=0.75):
+        self.terms = terms
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_len)
+        self.avgdl = float(np.mean(doc_len)) if self.n_docs else 0.0
+
+    # -------------------- Build / Persist -------------------- #
+    @classmethod
+    def build(cls, texts, k1=1.2, b=0.75):
+        postings = {}
+        doc_len = np.zeros(len(texts), dtype=np.uint32)
+        for i, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[i] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((i, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+        doc_ids = np.empty(int(offsets[-1]), dtype=np.uint32)
+        tfs = np.empty(int(offsets[-1]), dtype=np.uint16)
+        for j, term in enumerate(terms):
+            start, end = int(offsets[j]), int(offsets[j + 1])
+            entries = postings[term]
+            doc_ids[start:end] = [d for d, _ in entries]
+            tfs[start:end] = [min(tf, 65535) for _, tf in entries]
+        return cls(terms, offsets, doc_ids, tfs, doc_len, k1, b)
+
+    def save(self, path):
+        """Write the index to directory path (replaced atomically)."""
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, array in zip(self.FILES, (self.offsets, self.doc_ids, self.tfs, self.doc_len)):
+            np.save(os.path.join(tmp_path, name), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"terms": self.terms, "k1": self.k1, "b": self.b}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = [np.load(os.path.join(path, name), mmap_mode="r") for name in cls.FILES]
+        return cls(meta["terms"], *arrays, k1=meta["k1"], b=meta["b"])
+
+    # -------------------- Scoring -------------------- #
+    def idf(self, df):
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=10, allowed=None):
+        """
+        Top-k (chunk_id, score, confidence) for the query, among the chunk ids
+        in allowed if given.
+        confidence is the score relative to an average-length chunk containing
+        every query term once (clipped to [0, 1]); query terms absent from the
+        document count against it.
+        """
+        terms = tokenize(query)
+        if not terms or not self.n_docs:
+            return []
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        best_possible = 0.0
+        norm = self.k1 * (1 - self.b + self.b * np.asarray(self.doc_len, dtype=np.float32) / (self.avgdl or 1.0))
+        for term in set(terms):
+            j = self.vocab.get(term)
+            if j is None:
+                best_possible += self.idf(0)
+                continue
+            start, end = int(self.offsets[j]), int(self.offsets[j + 1])
+            ids = np.asarray(self.doc_ids[start:end], dtype=np.int64)
+            tf = np.asarray(self.tfs[start:end], dtype=np.float32)
+            idf = self.idf(end - start)
+            best_possible += idf
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm[ids])
+        if allowed is not None:
+            mask = np.zeros(self.n_docs, dtype=bool)
+            mask[np.asarray(allowed, dtype=np.int64)] = True
+            scores[~mask] = 0
+
+        k = min(k, self.n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i]), min(1.0, float(scores[i]) / best_possible))
+                for i in top if scores[i] > 0]
+
+    def memory_bytes(self):
+        return 64 * len(self.terms)
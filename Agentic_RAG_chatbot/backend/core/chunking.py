@@ -0,0 +1,68 @@
+import re
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+# End of a sentence (punctuation, optional closing quote/bracket, whitespace) or a blank line
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+|\n\s*\n")
+# Fallback tokenizer: words and single punctuation marks, roughly WordPiece granularity
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def token_offsets(text, tokenizer=None):
+    """(n_tokens, 2) array of [start, end) character spans of each token in text."""
+    if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        offsets = np.asarray(encoding["offset_mapping"], dtype=np.int64).reshape(-1, 2)
+        return offsets[offsets[:, 1] > offsets[:, 0]]
+    return np.array([m.span() for m in _APPROX_TOKEN.finditer(text)], dtype=np.int64).reshape(-1, 2)
+
+
+def sentence_boundaries(text, offsets):
+    """Token indices at which a new sentence starts (always includes 0 and n_tokens)."""
+    ends = np.fromiter((m.end() for m in _SENTENCE_BREAK.finditer(text)), dtype=np.int64)
+    boundaries = np.searchsorted(offsets[:, 0], ends)
+    return np.unique(np.concatenate(([0, len(offsets)], boundaries))).tolist()
+
+
+def chunk_spans(text, tokenizer=None, max_tokens=254, overlap_tokens=32, sentence_aware=True, offsets=None):
+    """
+    Split text into (start, end) character spans of at most max_tokens tokens.
+    Works on offsets into the original string, so no chunk strings are built.
+    Chunks end on a sentence boundary when one falls in the second half of
+    the budget, and consecutive chunks share about overlap_tokens tokens
+    (starting at a sentence boundary where possible).
+    """
+    if offsets is None:
+        offsets = token_offsets(text, tokenizer)
+    n = len(offsets)
+    if n == 0:
+        return []
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    boundaries = sentence_boundaries(text, offsets) if sentence_aware else [0, n]
+
+    spans = []
+    i = 0
+    while True:
+        end = min(i + max_tokens, n)
+        if end < n and sentence_aware:
+            # Last sentence boundary inside the budget, if it keeps the chunk at least half full
+            b = boundaries[bisect_right(boundaries, end) - 1]
+            if b - i >= max_tokens // 2:
+                end = b
+        spans.append((int(offsets[i, 0]), int(offsets[end - 1, 1])))
+        if end >= n:
+            return spans
+
+        next_i = end - overlap_tokens
+        if sentence_aware and overlap_tokens:
+            # Start the overlap at the first sentence boundary inside it, if any
+            b = boundaries[bisect_left(boundaries, next_i)]
+            if b < end:
+                next_i = b
+        i = max(next_i, i + 1)
+
+
+def materialize(text, spans):
+    """Chunk strings for the given spans."""
+    return [text[start:end] for start, end in spans]
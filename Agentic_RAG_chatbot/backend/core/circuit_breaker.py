@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker around an upstream endpoint.
+    failure_threshold consecutive failures open the circuit; callers then
+    fail fast until the open period ends. The next call is a single half-open
+    probe: success closes the circuit, failure re-opens it for twice as long
+    (up to max_reset_timeout, with jitter so a fleet does not probe in step).
+    """
+
+    def __init__(self, name="upstream", failure_threshold=3, reset_timeout=5.0, max_reset_timeout=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_count = 0
+        self._open_for = reset_timeout
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._last_error = None
+        self._lock = threading.Lock()
+
+    # -------------------- Admission -------------------- #
+    def would_allow(self):
+        """True if allow() would currently let a call through (does not claim the probe)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() >= self._open_until
+            return not self._probe_pending()
+
+    def _probe_pending(self):
+        # A probe whose caller vanished (cancelled request) stops blocking after max_reset_timeout
+        return self._probe_in_flight and time.monotonic() - self._probe_started < self.max_reset_timeout
+
+    def allow(self):
+        """Admit a call; moves open -> half-open once the open period is over."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() < self._open_until:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_pending():
+                return False
+            self._probe_in_flight = True
+            self._probe_started = time.monotonic()
+            return True
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 when closed)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._open_until - time.monotonic())
+
+    # -------------------- Outcomes -------------------- #
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._open_for = self.reset_timeout
+            self._probe_in_flight = False
+            self._last_error = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self.state == HALF_OPEN:
+                self._open_for = min(self._open_for * 2, self.max_reset_timeout)
+                self._trip()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self.opened_count += 1
+        self._probe_in_flight = False
+        self._open_until = time.monotonic() + self._open_for * random.uniform(0.8, 1.2)
+        print(f" Circuit '{self.name}' opened for ~{self._open_for:.0f}s after {self.failures} failures")
+
+    # -------------------- Backoff / Metrics -------------------- #
+    @staticmethod
+    def backoff(attempt, base=0.25, cap=4.0):
+        """Full-jitter exponential backoff delay before retry number attempt + 1."""
+        return random.uniform(0, min(cap, base * 2 ** attempt))
+
+    def snapshot(self):
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.opened_count,
+                "retry_after_s": round(retry_after, 2),
+                "last_error": self._last_error,
+            }
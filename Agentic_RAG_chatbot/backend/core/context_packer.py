@@ -0,0 +1,173 @@
+import os
+from itertools import chain
+
+import numpy as np
+
+from backend.core.chunking import token_offsets
+
+
+class PackedContext:
+    """Packed prompt context plus what packing saved."""
+
+    def __init__(self, text, chunks, stats):
+        self.text = text
+        self.chunks = chunks
+        self.stats = stats
+
+    def __bool__(self):
+        return bool(self.text)
+
+    def describe(self):
+        s = self.stats
+        return f"{s['candidate_tokens']} -> {s['packed_tokens']} prompt tokens (saved {s['saved_tokens']})"
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into prompt context under a token budget.
+    Chunks are taken in the given order (relevance, or document order).
+    Overlapping spans of the same page are trimmed or dropped. Chunks whose
+    stored embedding is nearly identical to one already packed are dropped.
+    Chunks that no longer fit in the budget are skipped. Token counts use
+    the target model's tokenizer when one is configured (CONTEXT_TOKENIZER),
+    otherwise the same word/punctuation approximation as the chunker.
+    """
+
+    def __init__(self, faiss_store=None, tokenizer=None, overlap_threshold=0.5, similarity_threshold=0.95):
+        self.faiss_store = faiss_store
+        self.tokenizer = tokenizer
+        self.overlap_threshold = overlap_threshold
+        self.similarity_threshold = similarity_threshold
+        self.totals = {"requests": 0, "candidate_tokens": 0, "packed_tokens": 0}
+
+    def count_tokens(self, text):
+        return len(token_offsets(text, self.tokenizer))
+
+    def truncate(self, text, max_tokens):
+        """Longest prefix of text with at most max_tokens tokens."""
+        offsets = token_offsets(text, self.tokenizer)
+        if len(offsets) <= max_tokens:
+            return text
+        return text[:int(offsets[max_tokens - 1, 1])]
+
+    # -------------------- Deduplication -------------------- #
+    def _trim_overlap(self, item, kept):
+        """Text of item minus any span already covered by a kept chunk of the same page (None to drop)."""
+        meta = item["metadata"]
+        if "start" not in meta or "end" not in meta:
+            return item["text"]
+        start, end, text = meta["start"], meta["end"], item["text"]
+        for other in kept:
+            o = other["metadata"]
+            if other["doc_id"] != item["doc_id"] or o.get("page") != meta.get("page") or "start" not in o:
+                continue
+            overlap = min(end, o["end"]) - max(start, o["start"])
+            if overlap <= 0:
+                continue
+            if overlap / max(1, min(end - start, o["end"] - o["start"])) >= self.overlap_threshold:
+                return None
+            if o["start"] <= start:  # kept chunk covers our head
+                text, start = text[o["end"] - start:], o["end"]
+            else:  # kept chunk covers our tail
+                text, end = text[:o["start"] - start], o["start"]
+        return text
+
+    def _vector(self, item):
+        """Stored, L2-normalized embedding of a chunk (None where unavailable)."""
+        if self.faiss_store is None or item["chunk_id"] is None or item["doc_id"] is None:
+            return None
+        v = self.faiss_store.get_vector(item["doc_id"], item["chunk_id"])
+        if v is None:
+            return None
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    # -------------------- Packing -------------------- #
+    def pack(self, hits, max_tokens, max_chunks=None, separator="\n\n", stop_when_full=False):
+        """
+        Pack SearchResults (or chunk records with doc_id / chunk_id) into at
+        most max_tokens tokens. stop_when_full keeps the context contiguous
+        (for reading order) instead of skipping ahead to chunks that still fit.
+        Returns a PackedContext whose stats hold candidates and candidate
+        tokens (the chunks examined, i.e. what joining them verbatim would
+        cost), packed tokens and why chunks were dropped. hits may be a lazy
+        iterable: it is consumed only up to the last chunk examined.
+        """
+        sep_tokens = self.count_tokens(separator) if separator.strip() else 0
+
+        kept, kept_vectors, parts, used, candidate_tokens = [], [], [], 0, 0
+        stats = {"candidates": 0, "overlap_dropped": 0, "near_duplicates": 0, "over_budget": 0}
+        for hit in hits:
+            if max_chunks is not None and len(kept) >= max_chunks:
+                break
+            item = self._as_item(hit)
+            stats["candidates"] += 1
+            candidate_tokens += self.count_tokens(item["text"])
+            text = self._trim_overlap(item, kept)
+            if text is None or not text.strip():
+                stats["overlap_dropped"] += 1
+                continue
+            vector = self._vector(item)
+            if vector is not None and kept_vectors and \
+                    max(float(vector @ v) for v in kept_vectors) >= self.similarity_threshold:
+                stats["near_duplicates"] += 1
+                continue
+            tokens = self.count_tokens(text) + (sep_tokens if parts else 0)
+            if used + tokens > max_tokens:
+                stats["over_budget"] += 1
+                if stop_when_full:
+                    break
+                continue
+            kept.append(item)
+            if vector is not None:
+                kept_vectors.append(vector)
+            parts.append(text.strip())
+            used += tokens
+
+        stats.update(chunks=len(kept), candidate_tokens=candidate_tokens, packed_tokens=used,
+                     saved_tokens=max(0, candidate_tokens - used), budget=max_tokens)
+        self.totals["requests"] += 1
+        self.totals["candidate_tokens"] += candidate_tokens
+        self.totals["packed_tokens"] += used
+        return PackedContext(separator.join(parts), kept, stats)
+
+    def pack_documents(self, doc_ids, max_tokens, fallback_text=""):
+        """
+        Document heads in reading order, deduplicated, up to max_tokens;
+        token-based truncation of fallback_text if no chunks are stored.
+        Records are decoded lazily: reading stops at the first chunk past the
+        budget, and candidate_tokens counts only the chunks that were read.
+        """
+        hits = iter(())
+        if self.faiss_store is not None:
+            hits = ({"doc_id": doc_id, "chunk_id": i, **c}
+                    for doc_id in doc_ids or [] for i, c in enumerate(self.faiss_store.iter_chunks(doc_id)))
+        first = next(hits, None)
+        if first is None:
+            text = self.truncate(fallback_text, max_tokens)
+            candidate_tokens = self.count_tokens(fallback_text)
+            packed_tokens = self.count_tokens(text)
+            return PackedContext(text, [], {"candidate_tokens": candidate_tokens, "packed_tokens": packed_tokens,
+                                            "saved_tokens": candidate_tokens - packed_tokens, "budget": max_tokens})
+        return self.pack(chain([first], hits), max_tokens, separator="\n", stop_when_full=True)
+
+    @staticmethod
+    def _as_item(hit):
+        if isinstance(hit, dict):
+            meta = {k: v for k, v in hit.items() if k not in ("text", "doc_id", "chunk_id")}
+            return {"doc_id": hit.get("doc_id"), "chunk_id": hit.get("chunk_id"), "text": hit.get("text", ""),
+                    "metadata": meta}
+        return {"doc_id": hit.doc_id, "chunk_id": hit.chunk_id, "text": hit.text, "metadata": hit.metadata}
+
+    def snapshot(self):
+        t = self.totals
+        return {**t, "saved_tokens": t["candidate_tokens"] - t["packed_tokens"]}
+
+
+def load_tokenizer(name=None):
+    """HF tokenizer of the generation model, if CONTEXT_TOKENIZER names one (None: approximate counts)."""
+    name = name or os.getenv("CONTEXT_TOKENIZER")
+    if not name:
+        return None
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name)
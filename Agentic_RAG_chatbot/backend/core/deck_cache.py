@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+DECK_PREFIX = "generated_ppt_"
+
+
+class DeckCache:
+    """
+    Generated PowerPoint decks keyed by document hash + normalized query.
+    Deck bytes are kept in an in-memory LRU (byte budget) and written to
+    outputs/ under a content-addressed name; the oldest deck files are
+    deleted once the directory exceeds max_disk_bytes.
+    """
+
+    def __init__(self, directory="outputs", max_memory_bytes=64 * 1024 * 1024, max_disk_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # filename -> bytes
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "files_pruned": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    # -------------------- Keys -------------------- #
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(re.findall(r"\w+", query.lower()))
+
+    @classmethod
+    def key(cls, doc_key: str, query: str) -> str:
+        return hashlib.sha256(f"{doc_key}\0{cls.normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def filename(key: str) -> str:
+        return f"{DECK_PREFIX}{key[:24]}.pptx"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, self.filename(key))
+
+    # -------------------- Memory Tier -------------------- #
+    def _remember(self, filename, data):
+        old = self._memory.pop(filename, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory[filename] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # -------------------- Public API -------------------- #
+    def get_file(self, filename: str):
+        """Bytes of a generated deck by file name (memory first, then outputs/), or None."""
+        if not (filename.startswith(DECK_PREFIX) and filename.endswith(".pptx")) or os.sep in filename:
+            return None
+        with self._lock:
+            data = self._memory.get(filename)
+            if data is not None:
+                self._memory.move_to_end(filename)
+                return data
+            path = os.path.join(self.directory, filename)
+            if not os.path.exists(path):
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # keep recently served decks away from pruning
+            self._remember(filename, data)
+            return data
+
+    def get(self, key: str):
+        data = self.get_file(self.filename(key))
+        self.stats["hits" if data is not None else "misses"] += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store deck bytes; returns the outputs/ path they are served from."""
+        path = self.path(key)
+        with self._lock:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._remember(self.filename(key), data)
+            self.stats["stored"] += 1
+            self._prune_disk(keep=path)
+        return path
+
+    def ensure_file(self, key: str, data: bytes) -> str:
+        """Path of a cached deck, rewriting the file if it was pruned."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return self.put(key, data)
+        return path
+
+    def _prune_disk(self, keep):
+        decks = []
+        for name in os.listdir(self.directory):
+            if name.startswith(DECK_PREFIX) and name.endswith(".pptx"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                decks.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in decks)
+        for _, size, path in sorted(decks):
+            if total <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats["files_pruned"] += 1
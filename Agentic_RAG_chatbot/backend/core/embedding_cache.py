@@ -0,0 +1,95 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of chunk vectors.
+    Keys are SHA-256 hashes of the chunk text, namespaced by model name, so
+    re-ingesting a document only embeds the chunks that actually changed.
+    Backed by SQLite; the least recently used entries are evicted once the
+    cache holds more than max_entries vectors for a model.
+    """
+
+    _BATCH = 500  # stay under SQLite's bound-parameter limit
+
+    def __init__(self, path="embedding_cache/embeddings.sqlite3", model_name="all-MiniLM-L6-v2", max_entries=200_000):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                   model TEXT NOT NULL,
+                   hash TEXT NOT NULL,
+                   vector BLOB NOT NULL,
+                   last_used REAL NOT NULL,
+                   PRIMARY KEY (model, hash)
+               ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (model, last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def chunk_hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    # -------------------- Lookup / Insert -------------------- #
+    def get_many(self, hashes):
+        """Bulk lookup: returns {hash: float32 vector} for the hashes that are cached."""
+        unique = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique), self._BATCH):
+                batch = unique[i:i + self._BATCH]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                    [(now, self.model_name, h) for h in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        """Store {hash: vector} pairs, then evict down to max_entries."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(self.model_name, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)).fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                """DELETE FROM embeddings WHERE model = ? AND hash IN (
+                       SELECT hash FROM embeddings WHERE model = ? ORDER BY last_used LIMIT ?)""",
+                (self.model_name, self.model_name, excess),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,106 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from backend.core.embeddings import get_query_embeddings
+from backend.core.metrics import metrics
+
+
+class QueryEmbeddingService:
+    """
+    Micro-batching query embedder.
+    Concurrent embed_queries() calls are collected for up to max_wait_ms (or
+    until max_batch_size queries are waiting) and encoded as one batch on a
+    worker thread, so the forward pass never blocks the event loop.
+    """
+
+    def __init__(self, encode_fn=get_query_embeddings, max_batch_size=32, max_wait_ms=5.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-embed")
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self.stats = {"queries": 0, "batches": 0, "largest_batch": 0}
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    # -------------------- Public API -------------------- #
+    async def embed_queries(self, queries):
+        """Embed a list of query strings; returns a (len(queries), dim) float32 array."""
+        if not queries:
+            return np.zeros((0, 0), dtype="float32")
+        self._ensure_worker()
+        futures = []
+        for query in queries:
+            future = self._loop.create_future()
+            self._queue.put_nowait((query, future))
+            futures.append(future)
+        with metrics.span("embed_query"):  # as seen by the caller: batching wait + forward pass
+            return np.stack(await asyncio.gather(*futures))
+
+    async def embed_query(self, query: str):
+        return (await self.embed_queries([query]))[0]
+
+    # -------------------- Batching Worker -------------------- #
+    async def _collect_batch(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            batch = [(q, f) for q, f in batch if not f.done()]  # drop cancelled callers
+            if not batch:
+                continue
+            texts = [q for q, _ in batch]
+            try:
+                vectors = await self._loop.run_in_executor(self._executor, self.encode_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats["queries"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            for (_, future), vector in zip(batch, np.asarray(vectors, dtype=np.float32)):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+
+# Shared instance for use across agents
+query_embedder = QueryEmbeddingService(
+    max_batch_size=int(os.getenv("QUERY_EMBED_MAX_BATCH", "32")),
+    max_wait_ms=float(os.getenv("QUERY_EMBED_MAX_WAIT_MS", "5")),
+)
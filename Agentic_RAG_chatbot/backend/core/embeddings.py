@@ -1,26 +1,72 @@
-from sentence_transformers import SentenceTransformer
-import textwrap
-
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-
-def chunk_text(text, max_chars=800):
-    paragraphs = text.split("\n")
-    chunks, current_chunk = [], ""
-
-    for para in paragraphs:
-        if len(current_chunk) + len(para) < max_chars:
-            current_chunk += para + " "
-        else:
-            chunks.append(current_chunk.strip())
-            current_chunk = para
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    return chunks
-
-def create_embeddings(text: str):
-    chunks = chunk_text(text)
-    embeddings = embedder.encode(chunks, convert_to_tensor=False)
-    return [{"text": c, "embedding": e} for c, e in zip(chunks, embeddings)]
-
-def get_query_embedding(query: str):
-    return embedder.encode([query])[0]
+import numpy as np
+import os
+
+from backend.core.embedding_cache import EmbeddingCache
+from backend.core.chunking import chunk_spans
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+def load_embedder(backend=EMBEDDING_BACKEND):
+    """PyTorch SentenceTransformer, or its ONNX Runtime export (fp32 / int8-quantized)."""
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(MODEL_NAME)
+    if backend in ("onnx", "onnx-int8"):
+        from backend.core.onnx_embedder import OnnxEmbedder
+        model_dir = os.getenv("ONNX_MODEL_DIR", os.path.join("onnx_models", MODEL_NAME))
+        return OnnxEmbedder(model_dir, quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; expected one of {EMBEDDING_BACKENDS}")
+
+embedder = load_embedder()
+embedding_cache = EmbeddingCache(
+    os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache/embeddings.sqlite3"),
+    # quantized vectors differ slightly, so each backend gets its own namespace
+    model_name=MODEL_NAME if EMBEDDING_BACKEND == "torch" else f"{MODEL_NAME}:{EMBEDDING_BACKEND}",
+    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")),
+)
+
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+def chunk_budget():
+    """Tokens per chunk: the embedder's sequence limit minus [CLS] / [SEP]."""
+    return getattr(embedder, "max_seq_length", 256) - 2
+
+def chunk_spans_for(text, max_tokens=None, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """(start, end) spans of token-budgeted, sentence-aware chunks of text."""
+    return chunk_spans(
+        text,
+        tokenizer=getattr(embedder, "tokenizer", None),
+        max_tokens=max_tokens or chunk_budget(),
+        overlap_tokens=overlap_tokens,
+    )
+
+def embed_texts(texts, stats=None):
+    """
+    Embed texts through the content-addressed cache.
+    Cached vectors are looked up in bulk and only the misses are encoded, in one batch.
+    If a stats dict is given, cache_hits / cache_misses are added to it.
+    """
+    hashes = [EmbeddingCache.chunk_hash(t) for t in texts]
+    cached = embedding_cache.get_many(hashes)
+
+    missing = {}  # hash -> text, deduplicated, in first-seen order
+    for h, t in zip(hashes, texts):
+        if h not in cached and h not in missing:
+            missing[h] = t
+    if missing:
+        encoded = embedder.encode(list(missing.values()), convert_to_tensor=False)
+        fresh = dict(zip(missing.keys(), np.asarray(encoded, dtype=np.float32)))
+        embedding_cache.put_many(fresh)
+        cached.update(fresh)
+
+    if stats is not None:
+        hits = sum(1 for h in hashes if h not in missing)
+        stats["cache_hits"] = stats.get("cache_hits", 0) + hits
+        stats["cache_misses"] = stats.get("cache_misses", 0) + len(hashes) - hits
+    return [cached[h] for h in hashes]
+
+def get_query_embeddings(queries):
+    """Encode a batch of queries in one forward pass."""
+    return embedder.encode(list(queries), convert_to_tensor=False)
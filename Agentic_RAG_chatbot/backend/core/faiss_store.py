@@ -1,83 +1,677 @@
 import faiss
 import numpy as np
 import os
+import json
 import pickle
+import shutil
+import threading
+from collections import OrderedDict
+from backend.core.record_store import RecordStore
+from backend.core.bm25 import BM25Index
+from backend.core.metrics import metrics
 
-class FAISSStore:
-    def __init__(self, index_path="faiss_index"):
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "fp16", "pq")
+# Types whose distances are approximate (compressed codes): re-ranked with the exact stored vectors
+LOSSY_INDEX_TYPES = ("sq8", "fp16", "pq", "ivf_pq")
+# Types trained on the vectors present at build time: retrained once the shard has doubled since
+RETRAIN_INDEX_TYPES = ("sq8", "pq", "ivf_pq")
+
+
+# -------------------- Index Construction -------------------- #
+def choose_index_type(n_vectors):
+    """Pick an index type from corpus size: exact search while it is cheap, ANN beyond."""
+    if n_vectors < 20_000:
+        return "flat"
+    if n_vectors < 200_000:
+        return "hnsw"
+    if n_vectors < 2_000_000:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def _default_nlist(n_vectors):
+    # ~4*sqrt(n) lists, keeping at least 39 training points per list
+    return max(1, min(int(4 * np.sqrt(n_vectors)), n_vectors // 39))
+
+
+def _default_pq_m(dim):
+    # largest sub-quantizer count <= dim / 8 that divides dim (48 for 384-d MiniLM)
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(vectors, min_points, max_points):
+    """
+    Training set of min_points..max_points rows: a random subset of large
+    corpora; small ones are repeated so k-means has as many points as centroids.
+    """
+    n = len(vectors)
+    if n < min_points:
+        return np.tile(vectors, (-(-min_points // n), 1))
+    if n > max_points:
+        return vectors[np.random.default_rng(0).choice(n, max_points, replace=False)]
+    return vectors
+
+
+def build_index(vectors, index_type="flat", nlist=None, pq_m=None, hnsw_m=32):
+    """
+    Create, train (for IVF / quantized types) and fill a FAISS index of the given type.
+    sq8 / fp16 store 1 / 2 bytes per dimension; pq stores pq_m bytes per vector
+    (pq_m must divide the dimension; default ~dim / 8).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type in ("sq8", "fp16"):
+        qtype = faiss.ScalarQuantizer.QT_8bit if index_type == "sq8" else faiss.ScalarQuantizer.QT_fp16
+        index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_L2)
+        index.train(vectors)
+    elif index_type == "pq":
+        m = pq_m or _default_pq_m(dim)
+        if dim % m:
+            raise ValueError(f"pq_m={m} must divide the vector dimension {dim}")
+        index = faiss.IndexPQ(dim, m, 8)
+        index.pq.cp.min_points_per_centroid = 1  # small shards: no under-training warnings
+        # 256 centroids per sub-quantizer need >= 256 training points
+        index.train(_training_sample(vectors, 256, 256 * 39))
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = 80
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = min(nlist or _default_nlist(n), n)  # never more lists than points
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+            min_points = nlist
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m or _default_pq_m(dim), 8)
+            index.pq.cp.min_points_per_centroid = 1
+            min_points = max(nlist, 256)  # 8-bit codebooks need 256 training residuals
+        index.cp.min_points_per_centroid = 1
+        # Train on a sample; FAISS needs no more than ~256 points per list
+        index.train(_training_sample(vectors, min_points, 256 * max(nlist, 256 if index_type == "ivf_pq" else 1)))
+    else:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+
+    index.add(vectors)
+    return index
+
+
+def search_params(index, nprobe=None, ef_search=None, selector=None):
+    """Per-query search parameters, so knobs never mutate the shared index."""
+    kwargs = {"sel": selector} if selector is not None else {}
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe), **kwargs)
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search), **kwargs)
+    return faiss.SearchParameters(**kwargs) if kwargs else None
+
+
+def search_post_filtered(index, queries, k, allowed):
+    """
+    Top-k restricted to the allowed ids, for indexes that take no search
+    parameters (IndexPQ rejects an IDSelector): over-fetch in proportion to the
+    filter's selectivity and widen until every query has k allowed hits or the
+    whole index was scanned. Returns (distances, ids) padded with (inf, -1).
+    """
+    k = min(k, len(allowed))
+    fetch = min(index.ntotal, k * max(1, index.ntotal // max(1, len(allowed))))
+    while True:
+        D, I = index.search(queries, fetch)
+        keep = np.isin(I, allowed)
+        if fetch >= index.ntotal or keep.sum(axis=1).min() >= k:
+            break
+        fetch = min(index.ntotal, 2 * fetch)
+    out_D = np.full((len(queries), k), np.inf, dtype="float32")
+    out_I = np.full((len(queries), k), -1, dtype=np.int64)
+    for row in range(len(queries)):
+        distances, ids = D[row][keep[row]][:k], I[row][keep[row]][:k]
+        out_D[row, :len(ids)], out_I[row, :len(ids)] = distances, ids
+    return out_D, out_I
+
+
+def index_type_of(index):
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def index_memory_bytes(index):
+    """Approximate RAM used by an index's vectors and graph/list structures."""
+    n, dim = index.ntotal, index.d
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return n * index.code_size + 2 * dim * 4
+    if isinstance(index, faiss.IndexPQ):
+        return n * index.pq.code_size + index.pq.centroids.size() * 4
+    if isinstance(index, faiss.IndexIVFPQ):
+        return n * (index.pq.M + 8) + index.nlist * dim * 4
+    if isinstance(index, faiss.IndexHNSW):
+        return n * (dim * 4 + index.hnsw.nb_neighbors(0) * 4 + 8)
+    if isinstance(index, faiss.IndexIVF):
+        return n * (dim * 4 + 8) + index.nlist * dim * 4
+    return n * dim * 4
+
+
+def bytes_per_vector(index):
+    """Index RAM per stored vector (codes plus amortized training data)."""
+    return index_memory_bytes(index) / max(1, index.ntotal)
+
+
+def rerank(vectors, queries, ids, k):
+    """
+    Re-score candidate ids (-1 = none) of each query by exact squared L2
+    against the stored float32 vectors; returns (distances, ids) of the top k.
+    """
+    D = np.full((len(queries), k), np.inf, dtype="float32")
+    I = np.full((len(queries), k), -1, dtype=np.int64)
+    for row, (query, candidates) in enumerate(zip(queries, ids)):
+        candidates = np.unique(candidates[candidates >= 0])  # sorted: sequential reads of the memmap
+        if not len(candidates):
+            continue
+        exact = np.asarray(vectors[candidates], dtype="float32")
+        distances = ((exact - query) ** 2).sum(axis=1)
+        top = np.argsort(distances)[:k]
+        D[row, :len(top)], I[row, :len(top)] = distances[top], candidates[top]
+    return D, I
+
+
+class SearchResult:
+    """One search hit. Built fresh per query; stored records are never mutated."""
+
+    __slots__ = ("doc_id", "chunk_id", "distance", "text", "metadata")
+
+    def __init__(self, doc_id, chunk_id, distance, text, metadata):
+        self.doc_id = doc_id
+        self.chunk_id = chunk_id
+        self.distance = distance  # squared L2: lower is closer
+        self.text = text
+        self.metadata = metadata
+
+    def to_dict(self):
+        """Legacy dict form: the record plus "similarity" (the distance) and "doc_id"."""
+        item = dict(self.metadata)
+        item.update({"text": self.text, "similarity": self.distance, "doc_id": self.doc_id})
+        return item
+
+    def __repr__(self):
+        return f"SearchResult(doc_id={self.doc_id!r}, chunk_id={self.chunk_id}, distance={self.distance:.4f})"
+
+
+def _as_query_matrix(queries):
+    queries = np.asarray(queries, dtype="float32")
+    return np.ascontiguousarray(queries.reshape(1, -1) if queries.ndim == 1 else queries)
+
+
+def _matches(record, filters):
+    """filters: {key: value | list/tuple/set of values | callable(value) -> bool}."""
+    for key, expected in filters.items():
+        value = record.get(key)
+        if callable(expected):
+            if not expected(value):
+                return False
+        elif isinstance(expected, (list, tuple, set, frozenset)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class FAISSShard:
+    """
+    A single FAISS index plus its chunk records, stored in one directory.
+    Records and vectors live in an append-only RecordStore. The index is
+    built lazily from the memory-mapped vectors on first use; trained
+    (non-flat) indexes are snapshotted to ann.faiss and vectors appended
+    after the snapshot are replayed on load.
+    Compressed types (sq8, fp16, pq, ivf_pq) keep only codes in RAM; with
+    rerank_factor > 0 they return rerank_factor * k candidates that are
+    re-scored with the exact float32 vectors of the on-disk memmap.
+    """
+
+    def __init__(self, index_path="faiss_index", index_type="auto", nprobe=16, ef_search=64, pq_m=None,
+                 rerank_factor=4):
+        if index_type != "auto" and index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}; expected 'auto' or one of {INDEX_TYPES}")
         self.index_path = index_path
-        self.index_file = os.path.join(index_path, "index.faiss")
-        self.data_file = os.path.join(index_path, "data.pkl")
-        self.index = None
-        self.data = []  # stores chunks or response texts
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.rerank_factor = rerank_factor
+        self._trained_on = 0  # vectors the current index was trained on
+        self.legacy_index_file = os.path.join(index_path, "index.faiss")
+        self.legacy_data_file = os.path.join(index_path, "data.pkl")
+        self.snapshot_file = os.path.join(index_path, "ann.faiss")
+        self._index = None
+        self._lock = threading.RLock()
+        self._filter_cache = {}  # (filter key, record count) -> matching ids
         os.makedirs(index_path, exist_ok=True)
-        self._load()
-
-    # -------------------- Load / Save -------------------- #
-    def _load(self):
-        """Load FAISS index + associated data (if available)."""
-        if os.path.exists(self.index_file) and os.path.exists(self.data_file):
-            self.index = faiss.read_index(self.index_file)
-            with open(self.data_file, "rb") as f:
-                self.data = pickle.load(f)
+        self.records = RecordStore(index_path)
+        self._migrate_legacy()
+
+    # -------------------- Load -------------------- #
+    def _migrate_legacy(self):
+        """Convert an old index.faiss + data.pkl pair into the record store."""
+        if len(self.records) or not os.path.exists(self.legacy_data_file):
+            return
+        with open(self.legacy_data_file, "rb") as f:
+            data = pickle.load(f)
+        if data and os.path.exists(self.legacy_index_file):
+            index = faiss.read_index(self.legacy_index_file)
+            vectors = index.reconstruct_n(0, index.ntotal)
+            records = []
+            for item in data[:len(vectors)]:
+                item = dict(item) if isinstance(item, dict) else {"text": str(item)}
+                item.pop("embedding", None)
+                item.pop("similarity", None)
+                records.append(item)
+            self.records.append(records, vectors[:len(records)])
+        for file in (self.legacy_index_file, self.legacy_data_file):
+            if os.path.exists(file):
+                os.remove(file)
+        print(f"Migrated legacy FAISS data in {self.index_path} ({len(self.records)} records)")
+
+    def _target_type(self):
+        if self.index_type == "auto":
+            return choose_index_type(len(self.records))
+        return self.index_type
+
+    @property
+    def index(self):
+        """FAISS index over the stored vectors (None while empty)."""
+        with self._lock:
+            if self._index is None and len(self.records):
+                self._index = self._load_or_build_index()
+            return self._index
+
+    def _matches_target(self, index, target):
+        if index_type_of(index) != target:
+            return False
+        if target in ("pq", "ivf_pq"):
+            return index.pq.M == (self.pq_m or _default_pq_m(index.d))
+        return True
+
+    def _load_or_build_index(self):
+        vectors = self.records.vectors()
+        target = self._target_type()
+
+        if target != "flat" and os.path.exists(self.snapshot_file):
+            index = faiss.read_index(self.snapshot_file)
+            stale = target in RETRAIN_INDEX_TYPES and len(vectors) > 2 * index.ntotal
+            if self._matches_target(index, target) and index.ntotal <= len(vectors) and not stale:
+                self._trained_on = index.ntotal  # snapshots are written right after training
+                if index.ntotal < len(vectors):
+                    index.add(np.ascontiguousarray(vectors[index.ntotal:]))
+                return index
+
+        index = build_index(vectors, target, pq_m=self.pq_m)
+        self._trained_on = len(vectors)
+        if target == "flat":
+            if os.path.exists(self.snapshot_file):
+                os.remove(self.snapshot_file)
         else:
-            self.index = None
-            self.data = []
+            self._write_snapshot(index)
+        return index
 
-    def _save(self):
-        """Persist FAISS index and metadata to disk."""
-        if self.index is not None:
-            faiss.write_index(self.index, self.index_file)
-            with open(self.data_file, "wb") as f:
-                pickle.dump(self.data, f)
+    def _write_snapshot(self, index):
+        tmp_file = self.snapshot_file + ".tmp"
+        faiss.write_index(index, tmp_file)
+        os.replace(tmp_file, self.snapshot_file)
 
     # -------------------- Create / Reset -------------------- #
     def create_index(self, chunks):
         """Create a brand-new FAISS index from chunks."""
-        embeddings = np.array([c["embedding"] for c in chunks]).astype("float32")
-        dim = embeddings.shape[1]
+        self.reset()
+        self.add_chunks(chunks)
 
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(embeddings)
-        self.data = chunks
-        self._save()
+    def add_chunks(self, chunks):
+        """Append chunks ({"text", "embedding", ...}) to the index and the record store."""
+        if not chunks:
+            return
+        embeddings = np.array([c["embedding"] for c in chunks]).astype("float32")
+        records = [{k: v for k, v in c.items() if k != "embedding"} for c in chunks]
+        with self._lock:
+            self.records.append(records, embeddings)
+            self._filter_cache.clear()
+            if self._index is None:
+                return
+            index_type = index_type_of(self._index)
+            if index_type != self._target_type():
+                self._index = None  # corpus outgrew the current type; rebuild lazily
+            elif index_type in RETRAIN_INDEX_TYPES and len(self.records) > 2 * self._trained_on:
+                self._index = None  # quantizer trained on too small a sample; retrain lazily
+            else:
+                self._index.add(embeddings)
 
     def reset(self):
         """Reset everything — clear FAISS and data."""
-        self.index = None
-        self.data = []
-        if os.path.exists(self.index_file):
-            os.remove(self.index_file)
-        if os.path.exists(self.data_file):
-            os.remove(self.data_file)
+        with self._lock:
+            self._index = None
+            self._filter_cache.clear()
+            self.records.reset()
+            if os.path.exists(self.snapshot_file):
+                os.remove(self.snapshot_file)
+
+    def close(self):
+        with self._lock:
+            self._index = None
+            self._filter_cache.clear()
+            self.records.close()
+
+    def memory_bytes(self):
+        """Rough RAM footprint of the loaded index and record offsets."""
+        if self._index is None:
+            return len(self.records) * 8
+        return index_memory_bytes(self._index) + len(self.records) * 8
 
     # -------------------- Search -------------------- #
-    def search(self, query_embedding, k=3):
-        """Find the top-k most similar entries."""
-        if self.index is None:
-            return []
-        D, I = self.index.search(np.array([query_embedding]).astype("float32"), k)
+    def filter_ids(self, filters):
+        """Ids of records whose metadata matches filters (cached until the next append)."""
+        try:
+            key = (tuple(sorted((k, repr(v)) for k, v in filters.items())), len(self.records))
+        except TypeError:
+            key = None
+        with self._lock:
+            if key is not None and key in self._filter_cache:
+                return self._filter_cache[key]
+            ids = np.fromiter((i for i, r in enumerate(self.records.iter_records()) if _matches(r, filters)),
+                              dtype=np.int64)
+            if key is not None and not any(callable(v) for v in filters.values()):
+                self._filter_cache[key] = ids
+            return ids
+
+    def search_batch(self, queries, k=3, filters=None, nprobe=None, ef_search=None, doc_id=None):
+        """
+        Top-k search for N query vectors in a single FAISS call.
+        Metadata filters restrict the candidate ids before the top-k cut.
+        Returns one list of SearchResult per query.
+        """
+        queries = _as_query_matrix(queries)
+        with self._lock:
+            index = self.index
+            if index is None:
+                return [[] for _ in range(len(queries))]
+            ids = selector = None
+            if filters:
+                ids = self.filter_ids(filters)
+                if not len(ids):
+                    return [[] for _ in range(len(queries))]
+                selector = faiss.IDSelectorBatch(ids)
+            exact = self.rerank_factor > 0 and index_type_of(index) in LOSSY_INDEX_TYPES
+            fetch = k * self.rerank_factor if exact else k
+            if selector is not None and isinstance(index, faiss.IndexPQ):
+                D, I = search_post_filtered(index, queries, fetch, ids)
+            else:
+                params = search_params(index, nprobe or self.nprobe, ef_search or self.ef_search, selector)
+                D, I = index.search(queries, fetch, params=params)
+            if exact:
+                D, I = rerank(self.records.vectors(), queries, I, k)
+
         results = []
-        for score, idx in zip(D[0], I[0]):
-            if idx < len(self.data):
-                item = self.data[idx]
-                if isinstance(item, dict):
-                    item["similarity"] = float(score)
-                else:
-                    item = {"text": item, "similarity": float(score)}
-                results.append(item)
+        for distances, ids in zip(D, I):
+            hits = []
+            for distance, idx in zip(distances, ids):
+                if 0 <= idx < len(self.records):
+                    record = self.records.get(int(idx))
+                    text = record.pop("text", "")
+                    hits.append(SearchResult(doc_id, int(idx), float(distance), text, record))
+            results.append(hits)
         return results
 
-    # -------------------- Add New Vector (for caching) -------------------- #
-    def add_vector(self, embedding, text):
-        """Add a single new text vector (for caching or incremental update)."""
-        embedding = np.array([embedding]).astype("float32")
+    def search(self, query_embedding, k=3, nprobe=None, ef_search=None):
+        """Find the top-k most similar entries (nprobe / ef_search tune IVF / HNSW recall)."""
+        hits = self.search_batch([query_embedding], k=k, nprobe=nprobe, ef_search=ef_search)[0]
+        return [hit.to_dict() for hit in hits]
+
+
+class FAISSStore:
+    """
+    Multi-document vector store.
+    Each document lives in its own shard directory named by the SHA-256 of
+    its bytes; loaded shards are kept in an LRU under a RAM budget.
+    Finished documents also get a BM25 index (bm25/ in the shard directory)
+    for lexical search.
+    """
+
+    def __init__(self, index_path="faiss_index", max_memory_mb=512, index_type="auto", nprobe=16, ef_search=64,
+                 pq_m=None, rerank_factor=4):
+        self.index_path = index_path
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.shard_options = {"index_type": index_type, "nprobe": nprobe, "ef_search": ef_search, "pq_m": pq_m,
+                              "rerank_factor": rerank_factor}
+        self._shards = OrderedDict()  # doc_id -> FAISSShard (most recent last)
+        self._building = set()  # doc_ids being ingested: searchable, never evicted
+        self._bm25 = {}  # doc_id -> memory-mapped BM25Index of a finished document
+        self._lock = threading.RLock()
+        os.makedirs(index_path, exist_ok=True)
+
+    # -------------------- Shard Paths / Metadata -------------------- #
+    def _shard_dir(self, doc_id):
+        return os.path.join(self.index_path, doc_id)
+
+    def _meta_file(self, doc_id):
+        return os.path.join(self._shard_dir(doc_id), "meta.json")
+
+    def _text_file(self, doc_id):
+        return os.path.join(self._shard_dir(doc_id), "text.txt")
+
+    def _bm25_dir(self, doc_id):
+        return os.path.join(self._shard_dir(doc_id), "bm25")
+
+    def has_document(self, doc_id):
+        """True if a fully built shard exists for this document."""
+        return bool(doc_id) and os.path.exists(self._meta_file(doc_id))
+
+    def is_searchable(self, doc_id):
+        """True for finished documents and for documents still being ingested."""
+        return doc_id in self._building or self.has_document(doc_id)
+
+    def list_documents(self):
+        """Metadata of every document indexed on disk."""
+        docs = []
+        for name in sorted(os.listdir(self.index_path)):
+            if self.has_document(name):
+                docs.append(self.get_metadata(name))
+        return docs
+
+    def get_metadata(self, doc_id):
+        with open(self._meta_file(doc_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_chunks(self, doc_id):
+        """Chunk records ({"text", "page", "start", "end"}) of a finished document, in ingestion order."""
+        return list(self.iter_chunks(doc_id))
+
+    def iter_chunks(self, doc_id):
+        """Same as get_chunks, decoding records lazily (readers that stop early skip the rest)."""
+        shard = self._get_shard(doc_id) if self.has_document(doc_id) else None
+        if shard is not None:
+            yield from shard.records.iter_records()
+
+    def get_vector(self, doc_id, chunk_id):
+        """Stored embedding of one chunk (None if the document or chunk is unknown)."""
+        shard = self._get_shard(doc_id)
+        if shard is None or not 0 <= chunk_id < len(shard.records):
+            return None
+        return np.array(shard.records.vectors()[chunk_id])
+
+    def get_text(self, doc_id):
+        """Full extracted text of a document (empty if unknown)."""
+        if not self.has_document(doc_id):
+            return ""
+        with open(self._text_file(doc_id), "r", encoding="utf-8") as f:
+            return f.read()
+
+    # -------------------- LRU of Loaded Shards -------------------- #
+    def _get_shard(self, doc_id):
+        """Return the shard for doc_id, loading it from disk if needed."""
+        with self._lock:
+            shard = self._shards.get(doc_id)
+            if shard is not None:
+                self._shards.move_to_end(doc_id)
+                return shard
+            if not self.has_document(doc_id) or doc_id in self._building:
+                return None
+            shard = FAISSShard(self._shard_dir(doc_id), **self.shard_options)
+            self._shards[doc_id] = shard
+            self._evict()
+            return shard
+
+    def _evict(self):
+        """Unload least-recently-used shards until within the RAM budget."""
+        with self._lock:
+            while self.memory_bytes() > self.max_memory_bytes:
+                evictable = [d for d in self._shards if d not in self._building][:-1]  # keep the most recent
+                if not evictable:
+                    break
+                shard = self._shards.pop(evictable[0])
+                shard.close()
+                self._bm25.pop(evictable[0], None)
+                print(f"Unloaded FAISS shard {evictable[0][:12]} (memory budget)")
+
+    def memory_bytes(self):
+        return sum(shard.memory_bytes() for shard in self._shards.values())
+
+    # -------------------- Create / Delete / Reset -------------------- #
+    def begin_document(self, doc_id):
+        """Start an incremental build; the shard is searchable while chunks arrive."""
+        with self._lock:
+            old = self._shards.pop(doc_id, None)
+            if old is not None:
+                old.close()
+            self._bm25.pop(doc_id, None)
+            shutil.rmtree(self._shard_dir(doc_id), ignore_errors=True)
+            shard = FAISSShard(self._shard_dir(doc_id), **self.shard_options)
+            self._shards[doc_id] = shard
+            self._building.add(doc_id)
+            return shard
+
+    def append_chunks(self, doc_id, chunks):
+        """Add embedded chunks to a document started with begin_document."""
+        with self._lock:
+            if doc_id not in self._building:
+                raise KeyError(f"Document {doc_id} is not being built")
+            shard = self._shards[doc_id]
+        shard.add_chunks(chunks)
+
+    def finalize_document(self, doc_id, text="", metadata=None):
+        """Write the document text and meta.json, marking the shard complete."""
+        with self._lock:
+            shard = self._shards[doc_id]
+        with open(self._text_file(doc_id), "w", encoding="utf-8") as f:
+            f.write(text)
+        BM25Index.build([r.get("text", "") for r in shard.records.iter_records()]).save(self._bm25_dir(doc_id))
+
+        meta = dict(metadata or {})
+        meta.update({"doc_id": doc_id, "text_length": len(text), "chunks": len(shard.records)})
+        tmp_file = self._meta_file(doc_id) + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_file, self._meta_file(doc_id))  # meta.json marks the shard as complete
+
+        with self._lock:
+            self._building.discard(doc_id)
+            self._shards.move_to_end(doc_id)
+            self._evict()
+        return meta
+
+    def delete_document(self, doc_id):
+        """Remove a document's shard from memory and disk."""
+        with self._lock:
+            self._building.discard(doc_id)
+            shard = self._shards.pop(doc_id, None)
+            if shard is not None:
+                shard.close()
+            self._bm25.pop(doc_id, None)
+            shutil.rmtree(self._shard_dir(doc_id), ignore_errors=True)
+
+    def reset(self):
+        """Unload every finished shard from memory (indexed documents stay on disk)."""
+        with self._lock:
+            for doc_id in [d for d in self._shards if d not in self._building]:
+                self._shards.pop(doc_id).close()
+                self._bm25.pop(doc_id, None)
+
+    # -------------------- Search -------------------- #
+    def search_batch(self, queries, k=3, doc_ids=None, filters=None, nprobe=None, ef_search=None):
+        """
+        Top-k search for N query vectors across the given documents.
+        Runs one FAISS call per shard and merges per query by distance.
+        Returns one list of SearchResult per query; stored data is never touched.
+        """
+        queries = _as_query_matrix(queries)
+        if doc_ids is None:
+            with self._lock:
+                doc_ids = list(self._shards.keys())
+
+        merged = [[] for _ in range(len(queries))]
+        with metrics.span("search"):
+            for doc_id in doc_ids:
+                shard = self._get_shard(doc_id)
+                if shard is None:
+                    continue
+                per_query = shard.search_batch(queries, k=k, filters=filters, nprobe=nprobe, ef_search=ef_search,
+                                               doc_id=doc_id)
+                for hits, shard_hits in zip(merged, per_query):
+                    hits.extend(shard_hits)
+
+        self._evict()  # indexes are built lazily, so re-check the budget after use
+        return [sorted(hits, key=lambda hit: hit.distance)[:k] for hits in merged]
+
+    # -------------------- Lexical Search -------------------- #
+    def _get_bm25(self, doc_id):
+        """BM25 index of a finished document; built on first use for documents indexed before BM25."""
+        with self._lock:
+            bm25 = self._bm25.get(doc_id)
+            if bm25 is not None or not self.has_document(doc_id):
+                return bm25
+            path = self._bm25_dir(doc_id)
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                shard = self._get_shard(doc_id)
+                BM25Index.build([r.get("text", "") for r in shard.records.iter_records()]).save(path)
+            bm25 = self._bm25[doc_id] = BM25Index.load(path)
+            return bm25
+
+    def lexical_search(self, query, k=3, doc_ids=None, filters=None):
+        """
+        Top-k chunks by BM25 score across the given finished documents
+        (restricted to chunks whose metadata matches filters, as in search_batch).
+        Returns SearchResults with distance = -score and the score and its
+        confidence in [0, 1] in metadata["bm25"] / metadata["bm25_confidence"].
+        """
+        if doc_ids is None:
+            with self._lock:
+                doc_ids = [d for d in self._shards if d not in self._building]
 
-        # Create a new index if not initialized
-        if self.index is None:
-            dim = embedding.shape[1]
-            self.index = faiss.IndexFlatL2(dim)
+        hits = []
+        with metrics.span("bm25"):
+            for doc_id in doc_ids:
+                bm25 = self._get_bm25(doc_id)
+                shard = self._get_shard(doc_id) if bm25 is not None else None
+                if shard is None:
+                    continue
+                allowed = shard.filter_ids(filters) if filters else None
+                for chunk_id, score, confidence in bm25.search(query, k, allowed=allowed):
+                    record = shard.records.get(chunk_id)
+                    text = record.pop("text", "")
+                    record.update(bm25=score, bm25_confidence=confidence)
+                    hits.append(SearchResult(doc_id, chunk_id, -score, text, record))
+        return sorted(hits, key=lambda hit: hit.distance)[:k]
 
-        self.index.add(embedding)
-        self.data.append({"text": text, "embedding": embedding.flatten().tolist()})
-        self._save()
+    def search(self, query_embedding, k=3, doc_ids=None, nprobe=None, ef_search=None):
+        """Find the top-k most similar chunks across the given documents."""
+        hits = self.search_batch([query_embedding], k=k, doc_ids=doc_ids, nprobe=nprobe, ef_search=ef_search)[0]
+        return [hit.to_dict() for hit in hits]
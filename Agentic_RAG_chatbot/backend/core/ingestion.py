@@ -0,0 +1,252 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.core.pdf_utils import iter_pdf_pages, shutdown_extract_pool
+from backend.core.embeddings import chunk_spans_for, embed_texts
+from backend.core.metrics import metrics
+
+STAGES = ("extract", "chunk", "embed", "index")
+_DONE = object()  # end-of-stream marker passed between stages
+
+
+class StageProgress:
+    """Item counts and timing of one pipeline stage."""
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def add(self, n=1):
+        self.items += n
+
+    def to_dict(self):
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started if self.started else 0.0
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "done": self.finished is not None,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(self.items / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class IngestionJob:
+    def __init__(self, doc_id, pdf_path, filename):
+        self.job_id = uuid.uuid4().hex
+        self.doc_id = doc_id
+        self.pdf_path = pdf_path
+        self.filename = filename
+        self.status = "queued"  # queued -> running -> done | failed
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.embedding_stats = {}
+        self.stages = {
+            "extract": StageProgress("extract", "pages"),
+            "chunk": StageProgress("chunk", "chunks"),
+            "embed": StageProgress("embed", "chunks"),
+            "index": StageProgress("index", "chunks"),
+        }
+        self.done_event = threading.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "doc_id": self.doc_id,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "elapsed_s": round((self.finished or time.time()) - self.created, 3),
+            "embedding_cache": dict(self.embedding_stats),
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+        }
+
+
+class IngestionManager:
+    """
+    Runs PDF ingestion as background jobs.
+    Each job is a pipeline extract -> chunk -> embed -> index with bounded
+    queues between stages, so embedding of early pages overlaps extraction
+    of later ones and chunks become searchable as soon as they are indexed.
+    """
+
+    def __init__(self, faiss_store, max_concurrent_jobs=2, queue_size=8, embed_batch_size=64, max_finished_jobs=200):
+        self.faiss_store = faiss_store
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()  # job_id -> IngestionJob
+        self._active = {}  # doc_id -> running IngestionJob
+        self._lock = threading.Lock()
+
+    # -------------------- Public API -------------------- #
+    def submit(self, pdf_path, doc_id, filename=None):
+        """Queue a job for doc_id, or return the one already in flight."""
+        with self._lock:
+            if doc_id in self._active:
+                return self._active[doc_id]
+            job = IngestionJob(doc_id, str(pdf_path), filename)
+            self._jobs[job.job_id] = job
+            self._active[doc_id] = job
+            self._prune()
+        self.faiss_store.begin_document(doc_id)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_job(self, doc_id):
+        with self._lock:
+            return self._active.get(doc_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        shutdown_extract_pool()
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.job_id]
+
+    # -------------------- Pipeline -------------------- #
+    @staticmethod
+    def _put(q, item, stop):
+        """Blocking put that gives up once another stage has failed."""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(q, stop):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _stage(self, job, stop, errors, fn):
+        """Run one stage function in a thread, recording failures."""
+        def target():
+            try:
+                fn()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        thread = threading.Thread(target=target, name=f"ingest-{job.job_id[:8]}", daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self, job):
+        job.status = "running"
+        stop = threading.Event()
+        errors = []
+        pages_q = queue.Queue(self.queue_size)
+        chunks_q = queue.Queue(self.queue_size)
+        embedded_q = queue.Queue(self.queue_size)
+        page_texts = []
+
+        def extract():
+            stage = job.stages["extract"]
+            stage.start()
+            page_start = time.perf_counter()
+            for page_no, text in iter_pdf_pages(job.pdf_path):
+                metrics.observe("extract", time.perf_counter() - page_start)  # per page, excluding backpressure
+                page_texts.append(text)
+                stage.add()
+                if not self._put(pages_q, (page_no, text), stop):
+                    return
+                page_start = time.perf_counter()
+            stage.finished = time.perf_counter()
+            self._put(pages_q, _DONE, stop)
+
+        def chunk():
+            stage = job.stages["chunk"]
+            stage.start()
+            batch = []
+            while (item := self._get(pages_q, stop)) is not _DONE:
+                page_no, text = item
+                with metrics.span("chunk"):
+                    spans = chunk_spans_for(text)
+                for start, end in spans:
+                    batch.append({"text": text[start:end], "page": page_no, "start": start, "end": end})
+                    stage.add()
+                    if len(batch) >= self.embed_batch_size:
+                        if not self._put(chunks_q, batch, stop):
+                            return
+                        batch = []
+            if stop.is_set():
+                return
+            if batch:
+                self._put(chunks_q, batch, stop)
+            stage.finished = time.perf_counter()
+            self._put(chunks_q, _DONE, stop)
+
+        def embed():
+            stage = job.stages["embed"]
+            stage.start()
+            while (batch := self._get(chunks_q, stop)) is not _DONE:
+                with metrics.span("embed"):
+                    vectors = embed_texts([c["text"] for c in batch], stats=job.embedding_stats)
+                for c, v in zip(batch, vectors):
+                    c["embedding"] = v
+                stage.add(len(batch))
+                if not self._put(embedded_q, batch, stop):
+                    return
+            if stop.is_set():
+                return
+            stage.finished = time.perf_counter()
+            self._put(embedded_q, _DONE, stop)
+
+        threads = [self._stage(job, stop, errors, fn) for fn in (extract, chunk, embed)]
+        try:
+            index_stage = job.stages["index"]
+            index_stage.start()
+            while (batch := self._get(embedded_q, stop)) is not _DONE:
+                with metrics.span("index"):
+                    self.faiss_store.append_chunks(job.doc_id, batch)
+                index_stage.add(len(batch))
+            for thread in threads:
+                thread.join()
+            if errors:
+                raise errors[0]
+            index_stage.finished = time.perf_counter()
+
+            text = "\n".join(page_texts).strip()
+            if not text:
+                raise ValueError("Could not extract text from PDF")
+            self.faiss_store.finalize_document(job.doc_id, text, metadata={"filename": job.filename})
+            job.status = "done"
+            print(f"Ingested {job.filename} ({job.stages['index'].items} chunks)")
+        except Exception as e:
+            stop.set()
+            self.faiss_store.delete_document(job.doc_id)
+            if os.path.exists(job.pdf_path):
+                os.remove(job.pdf_path)  # the stored upload; a retry uploads the bytes again
+            job.status = "failed"
+            job.error = str(e)
+            print(f"Ingestion of {job.filename} failed: {e}")
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._active.pop(job.doc_id, None)
+            job.done_event.set()
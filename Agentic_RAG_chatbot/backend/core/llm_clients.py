@@ -2,34 +2,117 @@ import asyncio
 import httpx
 import hashlib
 import json
-from functools import lru_cache
-from backend.core.faiss_store import FAISSStore
-from backend.core.embeddings import get_query_embedding
+import os
+from backend.core.response_cache import ResponseCache
+from backend.core.semantic_cache import SemanticCache
+from backend.core.scheduler import LLMScheduler
+from backend.core.circuit_breaker import CircuitBreaker
+from backend.core.embedding_service import query_embedder
+from backend.core.metrics import metrics
 import numpy as np
+import time
+
+OLLAMA_ERROR = " Error: Ollama not responding. Please ensure `ollama serve` is running and the model is pulled."
+
+
+class LLMUnavailable(RuntimeError):
+    """Raised by generate_stream when Ollama could not produce an answer (retries exhausted / circuit open)."""
+
+    def __init__(self, message=OLLAMA_ERROR.strip()):
+        super().__init__(message)
+
+
+class _Flight:
+    """One in-flight upstream generation that any number of callers can follow."""
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.task = None  # the upstream task; the event loop only keeps weak references to it
+        self._changed = asyncio.Condition()
+
+    async def publish(self, token: str):
+        async with self._changed:
+            self.tokens.append(token)
+            self._changed.notify_all()
+
+    async def finish(self, error: Exception = None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def follow(self):
+        """Replay tokens produced so far, then yield new ones until the flight ends."""
+        seen = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: seen < len(self.tokens) or self.done)
+                new_tokens = self.tokens[seen:]
+                finished, error = self.done, self.error
+            seen += len(new_tokens)
+            for token in new_tokens:
+                yield token
+            if finished and seen == len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
 
 class LLMClient:
     """
     Optimized Ollama client:
      Persistent connection
-     Local + FAISS cache
-     Robust retry logic
+     Tiered response cache (memory LRU + shared SQLite) + thresholded FAISS semantic cache
+     Circuit breaker + jittered exponential backoff around Ollama
      Works with streaming JSON responses
+     Single-flight: identical concurrent prompts share one generation
+     Priority scheduler: bounded concurrent generations, qa > summarize > ppt
     """
 
     def __init__(self, model_name="gemma2:2b", use_faiss_cache=True):
         self.model_name = model_name
-        self.api_url = "http://localhost:11434/api/generate"
+        self.api_url = os.getenv("OLLAMA_URL", "http://localhost:11434").rstrip("/") + "/api/generate"
         self._client = None
         self._is_warmed_up = False
         self.use_faiss_cache = use_faiss_cache
-        self.response_cache = {}
-        self.faiss_cache = FAISSStore("faiss_cache") if use_faiss_cache else None
+        self.response_cache = ResponseCache(
+            os.getenv("LLM_CACHE_PATH", "llm_cache/responses.sqlite3"),
+            namespace=model_name,
+            max_memory_bytes=int(os.getenv("LLM_CACHE_MEMORY_MB", "32")) * 1024 * 1024,
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600))),
+            max_disk_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000")),
+        )
+        self.faiss_cache = SemanticCache(
+            os.getenv("SEMANTIC_CACHE_PATH", "faiss_cache"),
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000")),
+            index_type=os.getenv("SEMANTIC_CACHE_INDEX_TYPE", "flat"),  # "fp16" / "sq8" halve / quarter the RAM
+        ) if use_faiss_cache else None
+        self.scheduler = LLMScheduler(
+            max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", "2")),
+            max_queue={
+                "qa": int(os.getenv("LLM_QUEUE_QA", "32")),
+                "summarize": int(os.getenv("LLM_QUEUE_SUMMARIZE", "8")),
+                "ppt": int(os.getenv("LLM_QUEUE_PPT", "4")),
+            },
+        )
+        self.breaker = CircuitBreaker(
+            "ollama",
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_S", "5")),
+            max_reset_timeout=float(os.getenv("LLM_BREAKER_MAX_RESET_S", "60")),
+        )
+        self.max_attempts = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+        self._inflight = {}  # prompt hash -> _Flight
+        self.coalesce_stats = {"upstream": 0, "coalesced": 0}
 
     # ------------------------------------------------------------
     async def _get_client(self):
         """Ensure one persistent async client for all HTTP calls."""
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=httpx.Timeout(120))
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(120, connect=5))
         return self._client
 
     # ------------------------------------------------------------
@@ -49,19 +132,18 @@ class LLMClient:
 
     # ------------------------------------------------------------
     @staticmethod
-    @lru_cache(maxsize=200)
     def _hash_prompt(system_prompt: str, prompt: str):
         """Hash the combined prompt for consistent cache keys."""
         key = f"{system_prompt}:{prompt}"
         return hashlib.sha256(key.encode()).hexdigest()
 
     # ------------------------------------------------------------
-    def _safe_embedding(self, text: str):
-        """Safely extract the embedding vector from get_query_embedding()."""
-        emb = get_query_embedding(text)
+    async def _safe_embedding(self, text: str):
+        """Safely extract the embedding vector from the shared query embedder."""
+        emb = await query_embedder.embed_query(text)
         # Normalize and validate
         if emb is None:
-            raise ValueError("get_query_embedding() returned None")
+            raise ValueError("query embedder returned None")
         
         # accept numpy arrays
         if isinstance(emb,np.ndarray):
@@ -69,37 +151,53 @@ class LLMClient:
         if isinstance(emb, (list, tuple)):
             # handle [[...]] or ( [...], )
             if len(emb) == 0:
-                raise ValueError("get_query_embedding() returned empty list/tuple")
+                raise ValueError("query embedder returned empty list/tuple")
             if isinstance(emb[0], (list, tuple)):
                 return emb[0]  # normal case: [[vector]]
             return emb        # already a vector
         raise TypeError(f"Unexpected embedding type: {type(emb)}")
 
     # ------------------------------------------------------------
-    async def generate(self, prompt: str, system_prompt: str = "") -> str:
-        """
-        Generate response via Ollama, with caching and retry logic.
-        """
-        full_prompt = f"{system_prompt}\n\nUser Query:\n{prompt}".strip()
-        key = self._hash_prompt(system_prompt, prompt)
-
-        #  1. Check local cache first
-        if key in self.response_cache:
-            print("⚡ Using cached response (local dict)")
-            return self.response_cache[key]
+    async def _cached_response(self, key: str, semantic: dict):
+        """Return a cached answer (exact, then semantic) or None; fills semantic["embedding"] if missing."""
+        #  1. Check the tiered exact-match cache first (SQLite may wait on a lock: off the event loop)
+        cached = await asyncio.to_thread(self.response_cache.get, key)
+        if cached is not None:
+            print("⚡ Using cached response (response cache)")
+            return cached
 
-        # 2. Check FAISS semantic cache
-        if self.use_faiss_cache and self.faiss_cache.index is not None:
+        # 2. Check the FAISS semantic cache (same model / system prompt / documents only)
+        if self.use_faiss_cache and semantic["text"] is not None and semantic["lookup"]:
             try:
-                query_embedding = self._safe_embedding(prompt)
-                similar_chunks = self.faiss_cache.search(query_embedding, k=1)
-                if similar_chunks:
-                    result_text = similar_chunks[0].get("text")
-                    if result_text:
-                        print(" Using FAISS semantic cache")
-                        return result_text
+                if semantic["embedding"] is None:
+                    semantic["embedding"] = await self._safe_embedding(semantic["text"])
+                # FAISS search (and a lazy index build on first use) is blocking: keep it off the event loop
+                cached = await asyncio.to_thread(self.faiss_cache.lookup, semantic["partition"], semantic["embedding"])
+                if cached is not None:
+                    print(" Using FAISS semantic cache")
+                    return cached
             except Exception as e:
                 print(f" FAISS cache skipped due to error: {e}")
+        return None
+
+    async def _store_response(self, key: str, semantic: dict, result_text: str, latency_s: float):
+        """Save a finished generation to the caches."""
+        await asyncio.to_thread(self.response_cache.put, key, result_text)
+        if self.use_faiss_cache and semantic["text"] is not None:
+            try:
+                if semantic["embedding"] is None:  # lookup skipped: embed now, after the answer went out
+                    semantic["embedding"] = await self._safe_embedding(semantic["text"])
+                # Appends fsync the record store and may rewrite the partition: off the event loop too
+                await asyncio.to_thread(self.faiss_cache.insert, semantic["partition"], semantic["embedding"],
+                                        result_text, latency_s)
+            except Exception as e:
+                print(f"Skipping FAISS cache insert due to: {e}")
+
+    # ------------------------------------------------------------
+    async def _upstream_stream(self, key: str, prompt: str, system_prompt: str, semantic: dict):
+        """Stream one generation from Ollama, retrying until the first token; caches the result."""
+        start = time.perf_counter()
+        full_prompt = f"{system_prompt}\n\nUser Query:\n{prompt}".strip()
 
         # 3. Prepare payload for Ollama
         max_tokens = 16 if "summarize" not in prompt.lower() else 64
@@ -111,51 +209,171 @@ class LLMClient:
             "temperature": 0.3,
         }
 
-        # 4. Try up to 3 times
-        for attempt in range(3):
+        # 4. Retry with jittered backoff (only until the first token has been sent on);
+        #    give up at once while the circuit is open
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                print(f" Ollama circuit {self.breaker.state}: failing fast")
+                break
+            parts = []
+            first_token_at = None
             try:
                 client = await self._get_client()
                 async with client.stream("POST", self.api_url, json=payload) as response:
                     response.raise_for_status()
-                    result_text = ""
 
                     async for line in response.aiter_lines():
                         if not line.strip():
                             continue
                         try:
                             data = json.loads(line)
-                            chunk = data.get("response", "")
-                            result_text += chunk
                         except json.JSONDecodeError:
                             continue
+                        chunk = data.get("response", "")
+                        if chunk:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter()
+                                metrics.observe("llm_ttft", first_token_at - start)
+                            parts.append(chunk)
+                            yield chunk
+                        if data.get("done"):
+                            break
 
-                    result_text = result_text.strip()
+                    result_text = "".join(parts).strip()
                     if not result_text:
                         raise ValueError("Empty response from Ollama stream.")
 
-                    # Save to caches
-                    self.response_cache[key] = result_text
-                    if self.use_faiss_cache:
-                        try:
-                            emb = self._safe_embedding(prompt)
-                            self.faiss_cache.add_vector(emb, result_text)
-                        except Exception as e:
-                            print(f"Skipping FAISS add_vector due to: {e}")
-
-                    return result_text
+                    self.breaker.record_success()
+                    end = time.perf_counter()
+                    metrics.observe("llm_generate", end - start)
+                    if len(parts) > 1 and end > first_token_at:
+                        metrics.tokens_per_second.observe((len(parts) - 1) / (end - first_token_at))
+                    await self._store_response(key, semantic, result_text, end - start)
+                    return
 
             except Exception as e:
-                print(f" Ollama error (attempt {attempt + 1}/3): {e}")
-                await asyncio.sleep(2)
+                self.breaker.record_failure(e)
+                if parts:
+                    raise  # tokens already reached the caller; a retry would duplicate them
+                print(f" Ollama error (attempt {attempt + 1}/{self.max_attempts}): {e}")
+                if attempt + 1 < self.max_attempts:
+                    await asyncio.sleep(self.breaker.backoff(attempt))
+
+        raise LLMUnavailable()
+
+    async def _run_flight(self, key: str, flight: _Flight, prompt: str, system_prompt: str, semantic: dict,
+                          priority: str):
+        """Drive the upstream generation for a flight; runs as its own task so followers outlive the leader."""
+        try:
+            if not self.breaker.would_allow():
+                raise LLMUnavailable()  # circuit open: don't queue for a slot
+            else:
+                async with self.scheduler.slot(priority):
+                    async for token in self._upstream_stream(key, prompt, system_prompt, semantic):
+                        await flight.publish(token)
+        except Exception as e:
+            await flight.finish(e)
+        else:
+            await flight.finish()
+        finally:
+            self._inflight.pop(key, None)
+
+    # ------------------------------------------------------------
+    async def generate_stream(self, prompt: str, system_prompt: str = "", timings: dict = None,
+                              doc_ids=None, semantic_key: str = None, priority: str = "qa",
+                              semantic_cache: bool = True, semantic_embedding=None, semantic_lookup: bool = True):
+        """
+        Async iterator over response tokens as Ollama produces them.
+        Cache hits are yielded as a single chunk; caches are filled once the
+        stream finishes. Concurrent calls with the same prompt subscribe to a
+        single upstream generation. If a timings dict is given it receives
+        ttft_s, total_s, tokens, cached and coalesced.
+        The semantic cache matches semantic_key (default: the prompt) against
+        earlier answers for the same model, system prompt and doc_ids
+        (semantic_cache=False limits the call to exact-match caching).
+        semantic_embedding is the caller's embedding of semantic_key, if it
+        already has one (saves a forward pass); semantic_lookup=False skips the
+        semantic lookup, and the answer is embedded for insertion only after it
+        has been generated.
+        Upstream calls go through the scheduler under the given priority class
+        and raise SchedulerBusy when that class's queue is full; LLMUnavailable
+        is raised when Ollama gave no answer (no tokens are yielded for it).
+        """
+        timings = timings if timings is not None else {}
+        start = time.perf_counter()
+        key = self._hash_prompt(system_prompt, prompt)
+        semantic = {
+            "partition": SemanticCache.partition_key(self.model_name, system_prompt, doc_ids),
+            "text": (semantic_key or prompt) if semantic_cache else None,
+            "embedding": semantic_embedding,
+            "lookup": semantic_lookup,
+        }
 
-        return " Error: Ollama not responding. Please ensure `ollama serve` is running and the model is pulled."
+        with metrics.span("llm_cache_lookup"):
+            cached = await self._cached_response(key, semantic)
+        if cached is not None:
+            timings.update(cached=True, coalesced=False, tokens=1, ttft_s=time.perf_counter() - start, total_s=time.perf_counter() - start)
+            yield cached
+            return
+
+        flight = self._inflight.get(key)
+        coalesced = flight is not None
+        if coalesced:
+            self.coalesce_stats["coalesced"] += 1
+            print("⚡ Joining in-flight generation for identical prompt")
+        else:
+            flight = self._inflight[key] = _Flight()
+            self.coalesce_stats["upstream"] += 1
+            flight.task = asyncio.create_task(self._run_flight(key, flight, prompt, system_prompt, semantic, priority))
+        timings.update(cached=False, coalesced=coalesced)
+
+        tokens = 0
+        async for token in flight.follow():
+            if not tokens:
+                timings["ttft_s"] = time.perf_counter() - start
+                print(f" Time to first token: {timings['ttft_s'] * 1000:.0f} ms")
+            tokens += 1
+            yield token
+        timings.update(tokens=tokens, total_s=time.perf_counter() - start)
+
+    # ------------------------------------------------------------
+    async def generate(self, prompt: str, system_prompt: str = "", doc_ids=None, semantic_key: str = None,
+                       priority: str = "qa", semantic_cache: bool = True, semantic_embedding=None,
+                       semantic_lookup: bool = True) -> str:
+        """
+        Generate response via Ollama, with caching and retry logic.
+        Returns OLLAMA_ERROR instead of raising LLMUnavailable.
+        """
+        stream = self.generate_stream(prompt, system_prompt, doc_ids=doc_ids, semantic_key=semantic_key,
+                                      priority=priority, semantic_cache=semantic_cache,
+                                      semantic_embedding=semantic_embedding, semantic_lookup=semantic_lookup)
+        try:
+            result_text = "".join([chunk async for chunk in stream])
+        except LLMUnavailable:
+            return OLLAMA_ERROR
+        return result_text.strip()
+
+    # ------------------------------------------------------------
+    def stats(self):
+        """Cache, coalescing and scheduler counters."""
+        return {
+            "model": self.model_name,
+            "response_cache": self.response_cache.snapshot(),
+            "semantic_cache": self.faiss_cache.snapshot() if self.faiss_cache is not None else None,
+            "coalescing": dict(self.coalesce_stats),
+            "scheduler": self.scheduler.snapshot(),
+            "circuit": self.breaker.snapshot(),
+        }
 
     # ------------------------------------------------------------
     async def close(self):
         """Gracefully close async client."""
         if self._client:
             await self._client.aclose()
+        self.response_cache.close()
+        if self.faiss_cache is not None:
+            self.faiss_cache.close()
 
 
 # Shared instance for use across agents
-llm_client = LLMClient(model_name="gemma2:2b",use_faiss_cache=False)
+llm_client = LLMClient(model_name="gemma2:2b", use_faiss_cache=os.getenv("SEMANTIC_CACHE", "1") == "1")
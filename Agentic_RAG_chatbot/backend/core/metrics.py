@@ -0,0 +1,161 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; wide enough for sub-millisecond BM25 lookups and minute-long summaries
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200, 500)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n=1, **labels):
+        key = tuple(str(labels[l]) for l in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Prometheus-style histogram (per-bucket counts, sum, count) per label set."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[l]) for l in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """
+    Process-wide latency histograms and counters, rendered in the Prometheus
+    text format. Pipeline stages report through span() / observe(); while a
+    request is being tracked (track_request), its per-stage totals are also
+    collected for a Server-Timing header. Counters that other components
+    already keep (cache hit / miss counts, queue depths) are read at scrape
+    time from registered collectors instead of being counted twice.
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "rag_stage_seconds", "Latency of pipeline stages (extract, chunk, embed, search, prompt_build, llm_*).",
+            labels=("stage",))
+        self.tokens_per_second = Histogram(
+            "rag_llm_tokens_per_second", "Upstream generation speed after the first token.", buckets=RATE_BUCKETS)
+        self.http_seconds = Histogram(
+            "rag_http_request_seconds", "Time to response headers per route.", labels=("method", "route"))
+        self.http_requests = Counter(
+            "rag_http_requests_total", "HTTP requests per route and status.", labels=("method", "route", "status"))
+        self._collectors = []
+
+    # -------------------- Recording -------------------- #
+    def observe(self, stage, seconds):
+        self.stage_seconds.observe(seconds, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # -------------------- Per-Request Timings -------------------- #
+    def track_request(self):
+        """Start collecting stage timings for the current request; returns the dict they land in."""
+        timings = {}
+        _request_timings.set(timings)
+        return timings
+
+    @staticmethod
+    def server_timing(timings):
+        """
+        Server-Timing header value for collected stage timings (durations in ms).
+        Stages that ran concurrently (e.g. summary map calls) are summed.
+        """
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+    # -------------------- Exposition -------------------- #
+    def add_collector(self, fn):
+        """
+        Register fn() -> iterable of (name, type, help, samples) with samples a
+        list of (labels dict, value); called on every scrape.
+        """
+        self._collectors.append(fn)
+
+    def render(self):
+        lines = []
+        for metric in (self.stage_seconds, self.tokens_per_second, self.http_seconds, self.http_requests):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared instance for use across the backend
+metrics = Metrics()
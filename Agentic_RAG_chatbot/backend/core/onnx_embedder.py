@@ -0,0 +1,64 @@
+import os
+import numpy as np
+
+
+class OnnxEmbedder:
+    """
+    ONNX Runtime version of the all-MiniLM-L6-v2 SentenceTransformer.
+    Reproduces its pipeline (mean pooling over the attention mask, then L2
+    normalization) and exposes the subset of the SentenceTransformer API the
+    backend uses: encode(), tokenizer and max_seq_length.
+
+    The model directory is produced by `python -m backend.core.onnx_export`.
+    """
+
+    def __init__(self, model_dir, quantized=False, max_seq_length=256, num_threads=None):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError("The ONNX embedding backend needs `pip install onnxruntime transformers`") from e
+
+        model_file = os.path.join(model_dir, "model_int8.onnx" if quantized else "model.onnx")
+        if not os.path.exists(model_file):
+            raise RuntimeError(f"{model_file} not found; run `python -m backend.core.onnx_export` first")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = max_seq_length
+
+    def _encode_batch(self, sentences):
+        tokens = self.tokenizer(
+            sentences, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        if "token_type_ids" in self.input_names and "token_type_ids" not in feeds:
+            feeds["token_type_ids"] = np.zeros_like(tokens["input_ids"], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, **kwargs):
+        """Same contract as SentenceTransformer.encode (numpy output only)."""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Sort by length so each batch pads to a similar size, then restore order
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        batches = [
+            self._encode_batch([sentences[i] for i in order[start:start + batch_size]])
+            for start in range(0, len(sentences), batch_size)
+        ]
+        result = np.empty((len(sentences), batches[0].shape[1]), dtype=np.float32)
+        result[order] = np.concatenate(batches)
+        return result[0] if single else result
@@ -0,0 +1,103 @@
+"""
+Export all-MiniLM-L6-v2 to ONNX (fp32 + dynamic int8) and check parity
+against the PyTorch SentenceTransformer.
+
+    python -m backend.core.onnx_export                 # export, then parity check
+    python -m backend.core.onnx_export --parity-only   # re-check an existing export
+
+The same check runs in backend/tests/test_onnx_parity.py (skipped without an
+export or the optional requirements-onnx.txt packages).
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+from backend.core.onnx_embedder import OnnxEmbedder
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_DIR = os.path.join("onnx_models", "all-MiniLM-L6-v2")
+
+# Minimum cosine similarity to the PyTorch vectors for each variant
+PARITY_THRESHOLDS = {"fp32": 0.9999, "int8": 0.98}
+
+PARITY_SENTENCES = [
+    "What is the main topic of this document?",
+    "Summarize the key findings in two sentences.",
+    "Snow White ran into the forest and found a small cottage.",
+    "Science is a systematic enterprise that builds and organizes knowledge.",
+    "Invoice number 4711 was issued on 3 March 2024 for 1,250.00 EUR.",
+    "The mitochondria is the powerhouse of the cell.",
+    "Create a presentation with three slides about the story.",
+    "a",
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40,
+]
+
+
+def export(model_name=DEFAULT_MODEL, out_dir=DEFAULT_DIR, opset=14):
+    """Write model.onnx, model_int8.onnx and the tokenizer files to out_dir."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(out_dir)
+
+    sample = tokenizer(["export sample sentence"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+        )
+    print(f"Exported {fp32_path}")
+
+    int8_path = os.path.join(out_dir, "model_int8.onnx")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Quantized {int8_path}")
+
+
+def check_parity(model_dir=DEFAULT_DIR, model_name=DEFAULT_MODEL, sentences=PARITY_SENTENCES):
+    """Compare ONNX fp32 / int8 vectors with PyTorch; returns {variant: (min_cos, mean_cos, passed)}."""
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(model_name).encode(sentences, convert_to_tensor=False, normalize_embeddings=True)
+    report = {}
+    for variant, quantized in (("fp32", False), ("int8", True)):
+        vectors = OnnxEmbedder(model_dir, quantized=quantized).encode(sentences)
+        cosine = np.sum(vectors * reference, axis=1)  # both sides are L2-normalized
+        report[variant] = (float(cosine.min()), float(cosine.mean()), bool(cosine.min() >= PARITY_THRESHOLDS[variant]))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--out-dir", default=DEFAULT_DIR)
+    parser.add_argument("--parity-only", action="store_true")
+    args = parser.parse_args()
+
+    if not args.parity_only:
+        export(args.model, args.out_dir)
+
+    ok = True
+    for variant, (min_cos, mean_cos, passed) in check_parity(args.out_dir, args.model).items():
+        ok &= passed
+        status = "OK" if passed else "FAIL"
+        print(f"{variant:>5}: min cos {min_cos:.5f}  mean cos {mean_cos:.5f}  (>= {PARITY_THRESHOLDS[variant]}) {status}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
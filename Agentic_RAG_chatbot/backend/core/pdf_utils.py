@@ -1,9 +1,130 @@
 import pdfplumber
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+PAGES_PER_TASK = 8
+COPY_CHUNK_BYTES = 1024 * 1024
+
+_pools = {}  # worker count -> ProcessPoolExecutor
+_pool_lock = threading.Lock()
+
+class UploadTooLarge(Exception):
+    """Raised while storing an upload that exceeds the size limit (HTTP 413)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        super().__init__(f"File exceeds the upload limit of {max_bytes / (1024 * 1024):.3g} MB.")
+
+def _open_pdf(source):
+    """pdfplumber accepts paths and file objects; raw bytes are wrapped."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return pdfplumber.open(source)
+
+def _extract_page_range(source, start, end):
+    """Extract pages [start, end) in a worker process; returns [(page_no, text)]."""
+    pages = []
+    with _open_pdf(source) as pdf:
+        for i in range(start, end):
+            page = pdf.pages[i]
+            pages.append((i + 1, page.extract_text() or ""))
+            page.flush_cache()  # release the page's parsed objects
+    return pages
+
+def count_pages(source) -> int:
+    with _open_pdf(source) as pdf:
+        return len(pdf.pages)
+
+def _start_method():
+    # forkserver workers are forked from a clean helper process, not from the server
+    # (no inherited threads, locks, models or sockets); spawn where it is unavailable
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def _extract_pool(workers):
+    """Process pool of the given size shared by all extractions, started on first use."""
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            context = multiprocessing.get_context(_start_method())
+            if context.get_start_method() == "forkserver":
+                context.set_forkserver_preload([__name__])  # workers start with pdfplumber imported
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return pool
+
+def shutdown_extract_pool():
+    """Stop the worker processes; the next extraction starts new pools."""
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def iter_pdf_pages(source, workers=None, pages_per_task=PAGES_PER_TASK):
+    """
+    Yield (page_no, text) for each page, in page order, as soon as it is ready.
+    Page ranges of a file path are extracted in parallel by a shared pool of
+    `workers` processes (default: PDF_EXTRACT_WORKERS, else the CPU count; one
+    long-lived pool per size), which is only sent the path. Bytes, file
+    objects, small documents and workers=1 are extracted in-process.
+    """
+    if hasattr(source, "read"):
+        source = source.read()
+    workers = workers or int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+    n_pages = count_pages(source)
+
+    if workers == 1 or n_pages <= pages_per_task or isinstance(source, (bytes, bytearray)):
+        yield from _extract_page_range(source, 0, n_pages)
+        return
+
+    pool = _extract_pool(workers)
+    futures = [
+        pool.submit(_extract_page_range, os.fspath(source), start, min(start + pages_per_task, n_pages))
+        for start in range(0, n_pages, pages_per_task)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()  # consumer stopped early (e.g. the job failed): drop queued ranges
 
 def extract_text_from_pdf(pdf_path: str) -> str:
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-            text += "\n"
-    return text.strip()
+    return "\n".join(text for _, text in iter_pdf_pages(pdf_path)).strip()
+
+class PdfUpload:
+    """
+    Temporary file in directory that an upload is written to as its blocks
+    arrive, hashed and counted in the same pass (document id = SHA-256 of the
+    bytes). write() raises UploadTooLarge as soon as more than max_bytes
+    arrived and removes the partial file. Blocking: call it off the event loop.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.discard()
+            raise UploadTooLarge(self.max_bytes)
+        self._digest.update(data)
+        self._file.write(data)
+
+    def finish(self):
+        """Close the file; returns (document id, temporary path) for the caller to rename or remove."""
+        self._file.close()
+        return self._digest.hexdigest(), self.path
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
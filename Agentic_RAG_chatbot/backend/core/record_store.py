@@ -0,0 +1,160 @@
+import json
+import mmap
+import os
+import threading
+import numpy as np
+
+
+class RecordStore:
+    """
+    Append-only on-disk store for chunk records and their vectors.
+
+    Layout of a store directory:
+      records.log    JSON-encoded records, concatenated
+      records.idx    uint64 end offset of each record in records.log
+      vectors.f32    float32 vectors, one row per record
+      manifest.json  committed record count / log size / dimension
+
+    Appends write past the committed end of each file and only become
+    visible once manifest.json is atomically replaced, so a crash mid-write
+    leaves the previous commit intact. Reads are lazy and go through mmap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.log_file = os.path.join(path, "records.log")
+        self.idx_file = os.path.join(path, "records.idx")
+        self.vec_file = os.path.join(path, "vectors.f32")
+        self.manifest_file = os.path.join(path, "manifest.json")
+        self._lock = threading.RLock()
+        self._log_map = None
+        self._offsets = None
+        self._vectors = None
+        os.makedirs(path, exist_ok=True)
+        self._open()
+
+    # -------------------- Manifest / Recovery -------------------- #
+    def _open(self):
+        """Read the manifest and drop any uncommitted (torn) tail."""
+        self.count, self.log_bytes, self.dim = 0, 0, None
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.count = manifest["count"]
+            self.log_bytes = manifest["log_bytes"]
+            self.dim = manifest["dim"]
+
+        vec_bytes = self.count * (self.dim or 0) * 4
+        for file, size in ((self.log_file, self.log_bytes), (self.idx_file, self.count * 8), (self.vec_file, vec_bytes)):
+            if os.path.exists(file) and os.path.getsize(file) > size:
+                with open(file, "r+b") as f:
+                    f.truncate(size)
+
+    def _write_manifest(self):
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "log_bytes": self.log_bytes, "dim": self.dim}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.manifest_file)
+        try:
+            dir_fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return  # directories can't be opened for fsync on Windows
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    # -------------------- Lazy Views -------------------- #
+    def _close_maps(self):
+        if self._log_map is not None:
+            self._log_map.close()
+        self._log_map, self._offsets, self._vectors = None, None, None
+
+    def _log_view(self):
+        if self._log_map is None and self.log_bytes:
+            with open(self.log_file, "rb") as f:
+                self._log_map = mmap.mmap(f.fileno(), self.log_bytes, access=mmap.ACCESS_READ)
+        return self._log_map
+
+    def _offset_view(self):
+        if self._offsets is None and self.count:
+            self._offsets = np.memmap(self.idx_file, dtype=np.uint64, mode="r", shape=(self.count,))
+        return self._offsets
+
+    def vectors(self):
+        """Committed vectors as a read-only (count, dim) float32 memmap."""
+        with self._lock:
+            if not self.count:
+                return np.zeros((0, self.dim or 0), dtype="float32")
+            if self._vectors is None:
+                self._vectors = np.memmap(self.vec_file, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+            return self._vectors
+
+    def __len__(self):
+        return self.count
+
+    # -------------------- Read -------------------- #
+    def get(self, i):
+        """Decode record i."""
+        with self._lock:
+            if not 0 <= i < self.count:
+                raise IndexError(i)
+            offsets = self._offset_view()
+            start = int(offsets[i - 1]) if i else 0
+            end = int(offsets[i])
+            return json.loads(self._log_view()[start:end].decode("utf-8"))
+
+    def get_many(self, ids):
+        return [self.get(int(i)) for i in ids]
+
+    def iter_records(self):
+        for i in range(self.count):
+            yield self.get(i)
+
+    # -------------------- Append / Reset -------------------- #
+    def append(self, records, vectors):
+        """Append records with their vectors and commit them atomically."""
+        if not len(records):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(len(records), -1)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+
+            payloads = [json.dumps(r, ensure_ascii=False).encode("utf-8") for r in records]
+            ends = self.log_bytes + np.cumsum([len(p) for p in payloads], dtype=np.uint64)
+
+            writes = (
+                (self.log_file, self.log_bytes, b"".join(payloads)),
+                (self.idx_file, self.count * 8, ends.tobytes()),
+                (self.vec_file, self.count * self.dim * 4, vectors.tobytes()),
+            )
+            self._close_maps()
+            for file, committed, data in writes:
+                with open(file, "r+b" if os.path.exists(file) else "wb") as f:
+                    f.seek(committed)
+                    f.truncate()  # discard leftovers of a failed append
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self.count += len(records)
+            self.log_bytes = int(ends[-1])
+            self._write_manifest()
+
+    def reset(self):
+        """Delete every record and vector."""
+        with self._lock:
+            self._close_maps()
+            for file in (self.manifest_file, self.log_file, self.idx_file, self.vec_file):
+                if os.path.exists(file):
+                    os.remove(file)
+            self.count, self.log_bytes, self.dim = 0, 0, None
+
+    def close(self):
+        with self._lock:
+            self._close_maps()
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses.
+    Tier 1 is an in-process LRU bounded by a byte budget; tier 2 is a SQLite
+    database in WAL mode that every uvicorn worker on the host shares and
+    that survives restarts. Entries expire after ttl_seconds and are
+    namespaced (by model name), so switching models never serves stale text.
+    """
+
+    _ENTRY_OVERHEAD = 120  # rough per-entry cost of the OrderedDict slot and tuple
+
+    def __init__(self, path="llm_cache/responses.sqlite3", namespace="default", max_memory_bytes=32 * 1024 * 1024,
+                 ttl_seconds=7 * 24 * 3600, max_disk_entries=100_000):
+        self.path = path
+        self.namespace = namespace
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (value, expires_at, size)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._puts_since_purge = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                      "memory_evictions": 0, "disk_evictions": 0, "expired": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   namespace TEXT NOT NULL,
+                   key TEXT NOT NULL,
+                   value TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   expires_at REAL NOT NULL,
+                   PRIMARY KEY (namespace, key)
+               ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_age ON responses (namespace, created_at)")
+        self._conn.commit()
+
+    # -------------------- Memory Tier -------------------- #
+    def _memory_put(self, key, value, expires_at):
+        size = len(key) + len(value.encode("utf-8")) + self._ENTRY_OVERHEAD
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[2]
+        self._memory[key] = (value, expires_at, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self.stats["memory_evictions"] += 1
+
+    def _memory_drop(self, key):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[2]
+
+    # -------------------- Public API -------------------- #
+    def get(self, key):
+        """Cached response for key, or None on a miss / expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[0]
+                self._memory_drop(key)
+                self.stats["expired"] += 1
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._conn.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._memory_put(key, value, expires_at)
+            self.stats["disk_hits"] += 1
+            return value
+
+    def put(self, key, value, ttl_seconds=None):
+        now = time.time()
+        expires_at = now + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            self._memory_put(key, value, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (self.namespace, key, value, now, expires_at)
+            )
+            self._puts_since_purge += 1
+            if self._puts_since_purge >= 100:
+                self._purge_disk(now)
+            self._conn.commit()
+
+    def _purge_disk(self, now):
+        """Drop expired rows, then the oldest rows beyond max_disk_entries."""
+        self._puts_since_purge = 0
+        self.stats["expired"] += self._conn.execute(
+            "DELETE FROM responses WHERE namespace = ? AND expires_at <= ?", (self.namespace, now)
+        ).rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses WHERE namespace = ?", (self.namespace,)).fetchone()
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._conn.execute(
+                """DELETE FROM responses WHERE namespace = ? AND key IN (
+                       SELECT key FROM responses WHERE namespace = ? ORDER BY created_at LIMIT ?)""",
+                (self.namespace, self.namespace, excess),
+            )
+            self.stats["disk_evictions"] += excess
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._conn.execute("DELETE FROM responses WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def snapshot(self):
+        """Counters plus current sizes, for health / metrics endpoints."""
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "namespace": self.namespace,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
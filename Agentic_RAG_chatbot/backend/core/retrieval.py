@@ -0,0 +1,70 @@
+import asyncio
+
+from backend.core.embedding_service import query_embedder
+
+RETRIEVAL_MODES = ("dense", "hybrid", "auto")
+
+
+def reciprocal_rank_fusion(result_lists, k=60, limit=None):
+    """Merge ranked SearchResult lists by sum of 1 / (k + rank); hits are identified by (doc_id, chunk_id)."""
+    scores, hits = {}, {}
+    for results in result_lists:
+        for rank, hit in enumerate(results):
+            key = (hit.doc_id, hit.chunk_id)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            hits.setdefault(key, hit)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [hits[key] for key in ranked[:limit]]
+
+
+class HybridRetriever:
+    """
+    BM25 + FAISS retrieval over a FAISSStore.
+    "dense" is plain vector search; "hybrid" fuses BM25 and vector
+    candidates with reciprocal-rank fusion; "auto" is hybrid, except that a
+    lexical top hit with confidence >= lexical_confidence is returned without
+    embedding the query at all (keyword / identifier lookups).
+    """
+
+    def __init__(self, faiss_store, mode="auto", candidates=20, lexical_confidence=0.8, rrf_k=60):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+        self.faiss_store = faiss_store
+        self.mode = mode
+        self.candidates = candidates
+        self.lexical_confidence = lexical_confidence
+        self.rrf_k = rrf_k
+        self.stats = {"dense": 0, "hybrid": 0, "lexical_only": 0}
+
+    async def _dense(self, query, k, doc_ids, filters):
+        query_embedding = await query_embedder.embed_query(query)
+        hits = await asyncio.to_thread(self.faiss_store.search_batch, [query_embedding], k=k, doc_ids=doc_ids,
+                                       filters=filters)
+        return hits[0], query_embedding
+
+    async def retrieve(self, query: str, k: int = 3, doc_ids=None, filters=None):
+        """Top-k SearchResults for the query, optionally among chunks matching metadata filters."""
+        hits, _ = await self.retrieve_with_embedding(query, k, doc_ids, filters)
+        return hits
+
+    async def retrieve_with_embedding(self, query: str, k: int = 3, doc_ids=None, filters=None):
+        """
+        (top-k SearchResults, query embedding) so callers can reuse the vector
+        (e.g. for the semantic cache); the embedding is None when a confident
+        lexical hit answered the query without one.
+        """
+        if self.mode == "dense":
+            self.stats["dense"] += 1
+            return await self._dense(query, k, doc_ids, filters)
+
+        candidates = max(self.candidates, k)
+        # BM25 scoring is synchronous CPU work (and may load indexes from disk): keep it off the event loop
+        lexical = await asyncio.to_thread(self.faiss_store.lexical_search, query, k=candidates, doc_ids=doc_ids,
+                                          filters=filters)
+        if self.mode == "auto" and lexical and lexical[0].metadata["bm25_confidence"] >= self.lexical_confidence:
+            self.stats["lexical_only"] += 1
+            return lexical[:k], None
+
+        self.stats["hybrid"] += 1
+        dense, query_embedding = await self._dense(query, candidates, doc_ids, filters)
+        return reciprocal_rank_fusion([dense, lexical], self.rrf_k, limit=k), query_embedding
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from backend.core.metrics import metrics
+
+PRIORITY_CLASSES = ("qa", "summarize", "ppt")  # highest priority first
+
+
+class SchedulerBusy(Exception):
+    """Raised instead of queueing when a priority class is at its queue-depth limit (HTTP 429)."""
+
+    def __init__(self, priority, depth, retry_after=1):
+        super().__init__(f"LLM queue for '{priority}' requests is full ({depth} waiting). Please retry shortly.")
+        self.priority = priority
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+class _ClassStats:
+    def __init__(self, window=512):
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.recent_waits = deque(maxlen=window)
+
+    def record_wait(self, wait_s):
+        self.admitted += 1
+        metrics.observe("llm_queue", wait_s)
+        self.wait_total_s += wait_s
+        self.wait_max_s = max(self.wait_max_s, wait_s)
+        self.recent_waits.append(wait_s)
+
+    def to_dict(self, waiting):
+        recent = sorted(self.recent_waits)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "waiting": waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_total_s / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 1),
+            "max_wait_ms": round(self.wait_max_s * 1000, 1),
+        }
+
+
+class LLMScheduler:
+    """
+    Admission control for upstream LLM generations.
+    At most max_concurrent generations run at once; callers beyond that wait
+    in one FIFO queue per priority class, and a freed slot always goes to the
+    highest class with a waiter (qa > summarize > ppt). A class whose queue
+    is at its depth limit rejects new callers immediately with SchedulerBusy.
+    """
+
+    def __init__(self, max_concurrent=2, max_queue=None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = {"qa": 32, "summarize": 8, "ppt": 4}
+        self.max_queue.update(max_queue or {})
+        self.running = 0
+        self._waiters = {p: deque() for p in PRIORITY_CLASSES}
+        self._stats = {p: _ClassStats() for p in PRIORITY_CLASSES}
+
+    @staticmethod
+    def _check_priority(priority):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITY_CLASSES}")
+
+    def _queued(self, priority):
+        return sum(1 for f in self._waiters[priority] if not f.done())
+
+    def would_reject(self, priority):
+        """True if acquire(priority) would raise SchedulerBusy right now."""
+        self._check_priority(priority)
+        if self.running < self.max_concurrent and not any(self._queued(p) for p in PRIORITY_CLASSES):
+            return False
+        return self._queued(priority) >= self.max_queue[priority]
+
+    # -------------------- Acquire / Release -------------------- #
+    async def acquire(self, priority="qa"):
+        self._check_priority(priority)
+        stats = self._stats[priority]
+        if self.running < self.max_concurrent and not any(self._queued(p) for p in PRIORITY_CLASSES):
+            self.running += 1
+            stats.record_wait(0.0)
+            return
+
+        depth = self._queued(priority)
+        if depth >= self.max_queue[priority]:
+            stats.rejected += 1
+            raise SchedulerBusy(priority, depth)
+
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # slot was handed over just as we were cancelled
+            else:
+                future.cancel()
+            raise
+        finally:
+            if future in self._waiters[priority]:
+                self._waiters[priority].remove(future)
+        stats.record_wait(time.perf_counter() - start)
+
+    def release(self):
+        """Free a slot and hand it to the highest-priority waiter, if any."""
+        self.running -= 1
+        for priority in PRIORITY_CLASSES:
+            waiters = self._waiters[priority]
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    self.running += 1
+                    future.set_result(None)
+                    return
+
+    @asynccontextmanager
+    async def slot(self, priority="qa"):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    # -------------------- Metrics -------------------- #
+    def snapshot(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "classes": {p: self._stats[p].to_dict(self._queued(p)) for p in PRIORITY_CLASSES},
+        }
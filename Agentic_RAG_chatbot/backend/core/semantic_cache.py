@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.core.faiss_store import FAISSShard
+
+
+def _normalize(vector):
+    v = np.asarray(vector, dtype="float32").reshape(-1)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of LLM answers.
+    Entries are partitioned by model, system prompt hash and document scope;
+    each partition is a FAISSShard in its own directory (flat, or a
+    compressed index_type whose candidates are re-ranked exactly), so a
+    lookup only ever compares against answers produced under the same
+    conditions.
+    A hit needs cosine similarity >= threshold on L2-normalized vectors.
+    Partitions hold at most max_entries answers; the oldest are dropped
+    first when one overflows.
+    """
+
+    def __init__(self, index_path="faiss_cache", threshold=0.95, max_entries=2000, max_open_partitions=32,
+                 index_type="flat"):
+        self.index_path = index_path
+        self.index_type = index_type
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_open_partitions = max_open_partitions
+        self._partitions = OrderedDict()  # partition key -> FAISSShard (most recent last)
+        self._lock = threading.RLock()
+        self.stats = {"lookups": 0, "hits": 0, "inserts": 0, "evictions": 0, "saved_s": 0.0}
+        os.makedirs(index_path, exist_ok=True)
+
+    # -------------------- Partitions -------------------- #
+    @staticmethod
+    def partition_key(model, system_prompt="", doc_ids=None):
+        """Stable directory name for (model, system prompt, document scope)."""
+        scope = ",".join(sorted(doc_ids)) if doc_ids else ""
+        system_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\0{system_hash}\0{scope}".encode("utf-8")).hexdigest()[:32]
+
+    def _partition(self, key, create=False):
+        with self._lock:
+            shard = self._partitions.get(key)
+            if shard is not None:
+                self._partitions.move_to_end(key)
+                return shard
+            path = os.path.join(self.index_path, key)
+            if not create and not os.path.isdir(path):
+                return None
+            shard = FAISSShard(path, index_type=self.index_type)
+            self._partitions[key] = shard
+            while len(self._partitions) > self.max_open_partitions:
+                _, old = self._partitions.popitem(last=False)
+                old.close()
+            return shard
+
+    # -------------------- Lookup / Insert -------------------- #
+    def lookup(self, key, embedding):
+        """Cached answer for embedding in partition key, or None below the threshold."""
+        query = _normalize(embedding)
+        with self._lock:
+            self.stats["lookups"] += 1
+            shard = self._partition(key)
+            if shard is None:
+                return None
+            hits = shard.search_batch([query], k=1)[0]
+            if not hits:
+                return None
+            # Squared L2 between unit vectors: d = 2 - 2 cos
+            similarity = 1.0 - hits[0].distance / 2.0
+            if similarity < self.threshold or not hits[0].text:
+                return None
+            self.stats["hits"] += 1
+            self.stats["saved_s"] += float(hits[0].metadata.get("latency_s", 0.0))
+            return hits[0].text
+
+    def insert(self, key, embedding, text, latency_s=0.0):
+        """Store an answer; trims the partition to max_entries (oldest first)."""
+        with self._lock:
+            shard = self._partition(key, create=True)
+            shard.add_chunks([{"text": text, "embedding": _normalize(embedding),
+                               "latency_s": round(latency_s, 4), "created": time.time()}])
+            self.stats["inserts"] += 1
+            if len(shard.records) > self.max_entries:
+                self._trim(shard)
+
+    def _trim(self, shard):
+        """Rewrite the partition keeping its newest 3/4 * max_entries answers."""
+        keep = max(1, self.max_entries * 3 // 4)
+        n = len(shard.records)
+        vectors = np.array(shard.records.vectors()[n - keep:])
+        records = shard.records.get_many(range(n - keep, n))
+        shard.create_index([dict(r, embedding=v) for r, v in zip(records, vectors)])
+        self.stats["evictions"] += n - keep
+
+    # -------------------- Stats / Reset -------------------- #
+    def snapshot(self):
+        with self._lock:
+            lookups, hits = self.stats["lookups"], self.stats["hits"]
+            return {
+                **self.stats,
+                "saved_s": round(self.stats["saved_s"], 3),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "avg_saved_latency_s": round(self.stats["saved_s"] / hits, 4) if hits else 0.0,
+                "threshold": self.threshold,
+                "open_partitions": len(self._partitions),
+            }
+
+    def close(self):
+        with self._lock:
+            for shard in self._partitions.values():
+                shard.close()
+            self._partitions.clear()
@@ -0,0 +1,146 @@
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class Session:
+    """Per-client state: the active document ids and a cache of their extracted text."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.doc_ids = []
+        self.texts = {}  # doc_id -> extracted text (dropped under memory pressure, reloaded on demand)
+        self.created = time.time()
+        self.last_seen = self.created
+
+    def memory_bytes(self):
+        return 512 + sum(sys.getsizeof(t) for t in self.texts.values()) + 100 * len(self.doc_ids)
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "doc_ids": list(self.doc_ids),
+            "cached_texts": len(self.texts),
+            "idle_s": round(time.time() - self.last_seen, 1),
+        }
+
+
+class SessionStore:
+    """
+    Sessions keyed by id, in LRU order.
+    Sessions idle for longer than ttl_seconds are dropped. When the cached
+    texts of all sessions exceed max_memory_bytes, the least recently used
+    sessions lose their text cache first (it is re-read from the document
+    store on the next request); index shards are shared through FAISSStore,
+    which loads and unloads them on its own RAM budget.
+    """
+
+    def __init__(self, faiss_store, max_memory_mb=256, ttl_seconds=3600, max_sessions=10_000):
+        self.faiss_store = faiss_store
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> Session (most recent last)
+        self._lock = threading.RLock()
+        self.stats = {"created": 0, "expired": 0, "evicted": 0, "texts_dropped": 0}
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def valid_id(session_id):
+        return bool(session_id) and bool(_SESSION_ID.match(session_id))
+
+    # -------------------- Lookup -------------------- #
+    def get_or_create(self, session_id=None):
+        """Session for session_id (a fresh one if unknown, expired or malformed)."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if not self.valid_id(session_id):
+                session_id = self.new_id()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id)
+                self.stats["created"] += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.stats["evicted"] += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = now
+            return session
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.stats["expired"] += 1
+
+    # -------------------- Session State -------------------- #
+    def set_documents(self, session, doc_ids):
+        with self._lock:
+            session.doc_ids = list(doc_ids)
+            session.texts = {d: t for d, t in session.texts.items() if d in session.doc_ids}
+
+    def forget_document(self, doc_id):
+        """Remove a deleted document from every session."""
+        with self._lock:
+            for session in self._sessions.values():
+                if doc_id in session.doc_ids:
+                    session.doc_ids.remove(doc_id)
+                session.texts.pop(doc_id, None)
+
+    def get_text(self, session, doc_ids):
+        """Joined text of doc_ids, served from the session cache and loaded lazily."""
+        parts = []
+        for doc_id in doc_ids:
+            with self._lock:
+                text = session.texts.get(doc_id)
+            if text is None:
+                text = self.faiss_store.get_text(doc_id)
+                with self._lock:
+                    session.texts[doc_id] = text
+                    self._enforce_budget(keep=session)
+            parts.append(text)
+        return "\n\n".join(parts)
+
+    def reset(self, session):
+        with self._lock:
+            session.doc_ids = []
+            session.texts = {}
+
+    # -------------------- Memory Budget -------------------- #
+    def memory_bytes(self):
+        with self._lock:
+            return sum(s.memory_bytes() for s in self._sessions.values())
+
+    def _enforce_budget(self, keep):
+        """Drop cached texts of least recently used sessions until within the budget."""
+        total = self.memory_bytes()
+        for session in list(self._sessions.values()):
+            if total <= self.max_memory_bytes:
+                return
+            if session is keep or not session.texts:
+                continue
+            total -= session.memory_bytes()
+            session.texts = {}
+            total += session.memory_bytes()
+            self.stats["texts_dropped"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "sessions": len(self._sessions),
+                "memory_bytes": self.memory_bytes(),
+                "max_memory_bytes": self.max_memory_bytes,
+            }
@@ -1,21 +1,30 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from pathlib import Path
 import os
-import shutil
+import json
+import time
+import asyncio
 from contextlib import asynccontextmanager
-from typing import Any
+from typing import Any, Dict, List, Optional
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
 
-from backend.core.pdf_utils import extract_text_from_pdf
-from backend.core.embeddings import create_embeddings, get_query_embedding
+from backend.core.pdf_utils import COPY_CHUNK_BYTES, PdfUpload, UploadTooLarge
+from backend.core.embedding_service import query_embedder
 from backend.core.faiss_store import FAISSStore
+from backend.core.ingestion import IngestionManager
+from backend.core.session_store import Session, SessionStore
+from backend.core.context_packer import ContextPacker, load_tokenizer
 from backend.agents.pdf_qa_agent import PDFQAAgent
 from backend.agents.summarization_agent import SummarizationAgent
 from backend.agents.ppt_agent import PPTAgent
-from backend.core.llm_clients import llm_client  
+from backend.core.llm_clients import LLMUnavailable, llm_client
+from backend.core.scheduler import SchedulerBusy
+from backend.core.metrics import metrics
 
 # -------------------- FASTAPI SETUP -------------------- #
 
@@ -26,17 +35,12 @@ async def lifespan(app: FastAPI):
     print("Model is warmed up and FAISS initialized.")
     yield
     await llm_client.close()
+    await query_embedder.close()
+    ingestion_manager.shutdown()
     print("Shutting down Agentic RAG Chatbot...")
 
 app = FastAPI(title="Agentic RAG Chatbot", lifespan=lifespan)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 # mount static file after app creation
 app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
 
@@ -52,18 +56,121 @@ for d in [UPLOAD_DIR, FAISS_DIR, OUTPUT_DIR]:
 
 # -------------------- GLOBAL STATE -------------------- #
 
-faiss_store = FAISSStore(str(FAISS_DIR))
-pdf_qa_agent = PDFQAAgent(faiss_store)
-summarization_agent = SummarizationAgent(faiss_store)
-ppt_agent = PPTAgent(faiss_store)
-current_pdf_text = ""
-last_uploaded_file = None
+faiss_store = FAISSStore(
+    str(FAISS_DIR),
+    max_memory_mb=int(os.getenv("FAISS_MAX_MEMORY_MB", "512")),
+    index_type=os.getenv("FAISS_INDEX_TYPE", "auto"),  # "auto", "flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "fp16", "pq"
+    pq_m=int(os.getenv("FAISS_PQ_M", "0")) or None,  # PQ code size in bytes per vector (must divide the dimension)
+    rerank_factor=int(os.getenv("FAISS_RERANK_FACTOR", "4")),  # 0: trust compressed distances
+)
+ingestion_manager = IngestionManager(
+    faiss_store,
+    max_concurrent_jobs=int(os.getenv("INGEST_MAX_JOBS", "2")),
+    queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "8")),
+)
+context_packer = ContextPacker(faiss_store, load_tokenizer())
+pdf_qa_agent = PDFQAAgent(faiss_store, context_packer=context_packer)
+summarization_agent = SummarizationAgent(faiss_store, context_packer=context_packer)
+ppt_agent = PPTAgent(faiss_store, output_dir=str(OUTPUT_DIR), context_packer=context_packer)
+session_store = SessionStore(
+    faiss_store,
+    max_memory_mb=int(os.getenv("SESSION_MAX_MEMORY_MB", "256")),
+    ttl_seconds=float(os.getenv("SESSION_TTL_S", "3600")),
+)
+
+# -------------------- SESSIONS -------------------- #
+
+SESSION_HEADER = "X-Session-Id"
+SESSION_COOKIE = "session_id"
+
+@app.middleware("http")
+async def session_middleware(request: Request, call_next):
+    """Attach a session id (header, then cookie, else a new one) and echo it on the response."""
+    requested = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    session_id = requested if SessionStore.valid_id(requested) else SessionStore.new_id()
+    request.state.session_id = session_id
+    response = await call_next(request)
+    response.headers[SESSION_HEADER] = session_id
+    if request.cookies.get(SESSION_COOKIE) != session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax",
+                            max_age=int(session_store.ttl_seconds))
+    return response
+
+def get_session(request: Request) -> Session:
+    return session_store.get_or_create(request.state.session_id)
+
+# -------------------- METRICS -------------------- #
+
+TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "0") == "1"  # per-request Server-Timing header
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Route latency / status counts; stage timings of this request in Server-Timing when enabled."""
+    timings = metrics.track_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")  # route templates keep label cardinality bounded
+    metrics.http_seconds.observe(elapsed, method=request.method, route=path)
+    metrics.http_requests.inc(method=request.method, route=path, status=response.status_code)
+    if TIMING_HEADER:
+        # Streaming responses only report the stages that ran before their first byte
+        response.headers["Server-Timing"] = metrics.server_timing({**timings, "total": elapsed})
+    return response
+
+def backend_counters():
+    """Counters the components already keep, read at scrape time."""
+    llm = llm_client.stats()
+    response_cache, semantic = llm["response_cache"], llm["semantic_cache"]
+    map_cache = summarization_agent.map_cache.snapshot()
+    deck = ppt_agent.deck_cache.stats
+    cache_samples = [
+        ({"cache": "response", "result": "memory_hit"}, response_cache["memory_hits"]),
+        ({"cache": "response", "result": "disk_hit"}, response_cache["disk_hits"]),
+        ({"cache": "response", "result": "miss"}, response_cache["misses"]),
+        ({"cache": "summary_map", "result": "memory_hit"}, map_cache["memory_hits"]),
+        ({"cache": "summary_map", "result": "disk_hit"}, map_cache["disk_hits"]),
+        ({"cache": "summary_map", "result": "miss"}, map_cache["misses"]),
+        ({"cache": "deck", "result": "hit"}, deck["hits"]),
+        ({"cache": "deck", "result": "miss"}, deck["misses"]),
+    ]
+    if semantic is not None:
+        cache_samples += [
+            ({"cache": "semantic", "result": "hit"}, semantic["hits"]),
+            ({"cache": "semantic", "result": "miss"}, semantic["lookups"] - semantic["hits"]),
+        ]
+    classes = llm["scheduler"]["classes"]
+    packing = context_packer.snapshot()
+    return [
+        ("rag_cache_lookups_total", "counter", "Cache lookups by cache and result.", cache_samples),
+        ("rag_llm_generations_total", "counter", "Generations that went upstream vs. joined an in-flight one.",
+         [({"path": path}, n) for path, n in llm["coalescing"].items()]),
+        ("rag_retrievals_total", "counter", "Q&A retrievals by path (dense, hybrid, lexical_only).",
+         [({"mode": mode}, n) for mode, n in pdf_qa_agent.retriever.stats.items()]),
+        ("rag_scheduler_waiting", "gauge", "Generations waiting for a slot.",
+         [({"priority": p}, c["waiting"]) for p, c in classes.items()]),
+        ("rag_scheduler_rejected_total", "counter", "Generations rejected with 429 (queue full).",
+         [({"priority": p}, c["rejected"]) for p, c in classes.items()]),
+        ("rag_scheduler_running", "gauge", "Generations holding a slot.", [({}, llm["scheduler"]["running"])]),
+        ("rag_ollama_circuit_open", "gauge", "1 while the Ollama circuit breaker is open.",
+         [({}, int(llm["circuit"]["state"] == "open"))]),
+        ("rag_context_tokens_total", "counter", "Prompt context tokens before and after packing.",
+         [({"kind": "candidate"}, packing["candidate_tokens"]), ({"kind": "packed"}, packing["packed_tokens"])]),
+        ("rag_query_embeddings_total", "counter", "Queries embedded by the micro-batching embedder.",
+         [({}, query_embedder.stats["queries"])]),
+        ("rag_sessions", "gauge", "Live sessions.", [({}, session_store.snapshot()["sessions"])]),
+    ]
+
+metrics.add_collector(backend_counters)
 
 # -------------------- MODELS -------------------- #
 
 class ChatRequest(BaseModel):
     message: str
     agent_type: str = "auto"  # "auto", "qa", "summarize", "ppt"
+    doc_ids: Optional[List[str]] = None  # defaults to the last uploaded document
+    filters: Optional[Dict[str, Any]] = None  # Q&A only: chunk metadata to match, e.g. {"page": [3, 4]}
 
 class ChatResponse(BaseModel):
     response: Any
@@ -75,78 +182,247 @@ class ChatResponse(BaseModel):
 async def root():
     return {"message": "Agentic RAG Chatbot API is running "}
 
-# ---------- Upload PDF and Create FAISS Index ---------- #
-@app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    global current_pdf_text, last_uploaded_file
-
-    if not file.filename.endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-
-    file_path = UPLOAD_DIR / file.filename
-
-    # Skip reprocessing if same PDF uploaded
-    if last_uploaded_file == file.filename and faiss_store.index is not None:
-        print("⚡ Skipping reprocessing, PDF already processed.")
-        return {"message": "PDF already processed", "filename": file.filename}
+@app.get("/llm/stats")
+async def llm_stats():
+    """Cache hit rates, coalescing, per-class scheduler queue waits and context-packing savings."""
+    return {**llm_client.stats(), "context_packing": context_packer.snapshot()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Stage latency histograms, HTTP and cache counters in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/sessions/stats")
+async def session_stats():
+    return session_store.snapshot()
+
+@app.get("/health")
+async def health():
+    """Liveness plus Ollama circuit state; 503 while the circuit is open so load balancers route around us."""
+    circuit = llm_client.breaker.snapshot()
+    healthy = circuit["state"] != "open"
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={"status": "ok" if healthy else "degraded", "ollama": circuit},
+        headers=None if healthy else {"Retry-After": str(max(1, round(circuit["retry_after_s"])))},
+    )
+
+def busy_response(e: SchedulerBusy):
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def resolve_doc_ids(doc_ids, session: Session, require_complete=False):
+    """Validate requested document ids, falling back to the session's active ones.
+    Q&A may run on documents that are still being ingested; full-text agents may not."""
+    doc_ids = doc_ids or session.doc_ids
+    if not doc_ids:
+        raise HTTPException(status_code=400, detail="Please upload a PDF first.")
+    unknown = [d for d in doc_ids if not faiss_store.is_searchable(d)]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown document id(s): {', '.join(unknown)}")
+    if require_complete and not all(faiss_store.has_document(d) for d in doc_ids):
+        raise HTTPException(status_code=409, detail="The document is still being processed. Please try again shortly.")
+    return doc_ids
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+# ---------- Upload PDF and Create FAISS Index ---------- #
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+UPLOAD_PATH = "/upload-pdf"
+
+@app.middleware("http")
+async def upload_size_guard(request: Request, call_next):
+    """Refuse uploads whose declared size is over the limit before any of the body is read."""
+    if request.url.path == UPLOAD_PATH and request.method == "POST":
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES + 64 * 1024:  # multipart framing
+            return JSONResponse(status_code=413, content={"detail": str(UploadTooLarge(MAX_UPLOAD_BYTES))})
+    return await call_next(request)
+
+# -------------------- CORS -------------------- #
+# Added after every @app.middleware so it is the outermost layer and early
+# responses (413 from the upload guard, errors) carry CORS headers too
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Session-Id", "Server-Timing"],
+)
 
+# The body is parsed by hand (receive_pdf), so document the form for /docs explicitly
+UPLOAD_OPENAPI = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}}}}}}}
+
+async def receive_pdf(request: Request, field: str = "file"):
+    """
+    Stream the `field` file part of a multipart upload from the request body
+    to a temporary file in UPLOAD_DIR, hashing and counting it in the same
+    pass. Nothing is spooled in between, so the size limit also bounds
+    chunked uploads without Content-Length. Returns (filename, doc_id, tmp_path).
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    headers, name, value = {}, [], []
+    filename, in_file, pending = None, False, []
+
+    def on_header_field(data, start, end):
+        name.append(data[start:end])
+
+    def on_header_value(data, start, end):
+        value.append(data[start:end])
+
+    def on_header_end():
+        headers[b"".join(name).lower()] = b"".join(value)
+        name.clear()
+        value.clear()
+
+    def on_headers_finished():
+        nonlocal filename, in_file
+        _, options = parse_options_header(headers.pop(b"content-disposition", None))
+        in_file = filename is None and options.get(b"name") == field.encode() and b"filename" in options
+        if in_file:
+            filename = options[b"filename"].decode("utf-8", "replace")
+        headers.clear()
+
+    def on_part_data(data, start, end):
+        if in_file:
+            pending.append(data[start:end])
+
+    def on_part_end():
+        nonlocal in_file
+        in_file = False
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_header_field": on_header_field, "on_header_value": on_header_value, "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished, "on_part_data": on_part_data, "on_part_end": on_part_end,
+    })
+    upload = None
     try:
-        current_pdf_text = extract_text_from_pdf(str(file_path))
-        if not current_pdf_text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
-
-        chunks = create_embeddings(current_pdf_text)
-        faiss_store.create_index(chunks)
-        last_uploaded_file = file.filename
-
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if filename is not None and upload is None:
+                if not filename.endswith(".pdf"):
+                    raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+                upload = await asyncio.to_thread(PdfUpload, str(UPLOAD_DIR), MAX_UPLOAD_BYTES)
+            # Disk writes go to a thread, batched so small network reads don't each cost a hop
+            if sum(map(len, pending)) >= COPY_CHUNK_BYTES:
+                data = b"".join(pending)
+                pending.clear()
+                await asyncio.to_thread(upload.write, data)
+        parser.finalize()
+        if upload is None:
+            raise HTTPException(status_code=400, detail=f"No file in the '{field}' form field")
+        if pending:
+            await asyncio.to_thread(upload.write, b"".join(pending))
+        doc_id, tmp_path = await asyncio.to_thread(upload.finish)
+    except BaseException as e:
+        if upload is not None:
+            await asyncio.to_thread(upload.discard)
+        if isinstance(e, UploadTooLarge):
+            raise HTTPException(status_code=413, detail=str(e))
+        if isinstance(e, MultipartParseError):
+            raise HTTPException(status_code=400, detail=f"Malformed multipart upload: {e}")
+        raise
+    return filename, doc_id, tmp_path
+
+@app.post(UPLOAD_PATH, openapi_extra=UPLOAD_OPENAPI)
+async def upload_pdf(request: Request, session: Session = Depends(get_session)):
+
+    # Stream to disk in chunks, hashing in the same pass (doc id = SHA-256 of the bytes)
+    filename, doc_id, tmp_path = await receive_pdf(request)
+    session_store.set_documents(session, [doc_id])
+
+    # Skip reprocessing if these exact bytes were indexed before (under any filename)
+    if faiss_store.has_document(doc_id):
+        os.remove(tmp_path)
+        print("⚡ Skipping reprocessing, PDF already processed.")
+        meta = faiss_store.get_metadata(doc_id)
         return {
-            "message": "PDF uploaded and processed successfully",
-            "filename": file.filename,
-            "text_length": len(current_pdf_text),
-            "chunks_created": len(chunks),
+            "message": "PDF already processed",
+            "filename": filename,
+            "doc_id": doc_id,
+            "status": "done",
+            "text_length": meta["text_length"],
+            "chunks_created": meta["chunks"],
         }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing PDF: {e}")
+    # Same bytes already being ingested: join that job
+    job = ingestion_manager.active_job(doc_id)
+    if job is not None:
+        os.remove(tmp_path)
+    else:
+        stored_path = UPLOAD_DIR / f"{doc_id}.pdf"  # content-addressed, so jobs never read a replaced file
+        os.replace(tmp_path, stored_path)
+        # Ingest in the background; the index is searchable while it is being built
+        job = ingestion_manager.submit(stored_path, doc_id, filename)
+    return JSONResponse(status_code=202, content={
+        "message": "PDF uploaded, processing started",
+        "filename": filename,
+        "doc_id": doc_id,
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/ingest/{job.job_id}",
+    })
+
+# ---------- Ingestion Progress ---------- #
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    job = ingestion_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
+
+# ---------- List / Delete Indexed Documents ---------- #
+@app.get("/documents")
+async def list_documents(session: Session = Depends(get_session)):
+    return {"documents": faiss_store.list_documents(), "active": session.doc_ids}
+
+@app.delete("/documents/{doc_id}")
+async def delete_document(doc_id: str):
+    if not faiss_store.has_document(doc_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    faiss_store.delete_document(doc_id)
+    (UPLOAD_DIR / f"{doc_id}.pdf").unlink(missing_ok=True)
+    session_store.forget_document(doc_id)
+    return {"message": "Document deleted", "doc_id": doc_id}
 
 # ---------- Chat with the System (QA / Summarize / PPT) ---------- #
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    global current_pdf_text
+def detect_agent(request: ChatRequest) -> str:
+    agent_type = request.agent_type.lower()
+    message = request.message.lower()
+
+    # Auto agent detection
+    if agent_type == "auto":
+        if any(word in message for word in ["summarize", "overview", "brief", "summary"]):
+            agent_type = "summarize"
+        elif any(word in message for word in ["create ppt","ppt","create a ppt","make appt","slides", "make ppt", "powerpoint", "slides"]):
+            agent_type = "ppt"
+        else:
+            agent_type = "qa"
+    return agent_type
 
-    if not current_pdf_text:
-        raise HTTPException(status_code=400, detail="Please upload a PDF first.")
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, session: Session = Depends(get_session)):
+    agent_type = detect_agent(request)
+    doc_ids = resolve_doc_ids(request.doc_ids, session, require_complete=agent_type in ("summarize", "ppt"))
 
     try:
-        agent_type = request.agent_type.lower()
-        message = request.message.lower()
-
-        # Auto agent detection
-        if agent_type == "auto":
-            if any(word in message for word in ["summarize", "overview", "brief", "summary"]):
-                agent_type = "summarize"
-            elif any(word in message for word in ["create ppt","ppt","create a ppt","make appt","slides", "make ppt", "powerpoint", "slides"]):
-                agent_type = "ppt"
-            else:
-                agent_type = "qa"
-
         # Route to correct agent
         if agent_type == "summarize":
-            response = await summarization_agent.process(request.message, current_pdf_text)
+            pdf_text = session_store.get_text(session, doc_ids)
+            response = await summarization_agent.process(request.message, pdf_text, doc_ids=doc_ids)
             agent_used = "Summarization Agent"
 
         elif agent_type == "ppt":
-            result = await ppt_agent.process(request.message, current_pdf_text)
+            pdf_text = session_store.get_text(session, doc_ids)
+            result = await ppt_agent.process(request.message, pdf_text, doc_ids=doc_ids)
             agent_used = "PPT Creation Agent"
 
             # extract file name if PPT created
-            if isinstance(result, str) and "generated_ppt_" in result:
+            if isinstance(result, str) and result.endswith(".pptx"):
                 # extract filename
-                filename = result.split("generated_ppt_")[-1].split(".pptx")[0]
-                filename = f"generated_ppt_{filename}.pptx"
+                filename = os.path.basename(result)
 
                 file_path = f"/outputs/{filename}"
                 download_url = f"http://localhost:8000{file_path}"
@@ -163,30 +439,92 @@ async def chat(request: ChatRequest):
             return ChatResponse(response=result, agent_used=agent_used)
 
         else:
-            response = await pdf_qa_agent.process(request.message)
+            response = await pdf_qa_agent.process(request.message, doc_ids=doc_ids, filters=request.filters)
             agent_used = "PDF Q&A Agent"
 
         return ChatResponse(response=response, agent_used=agent_used)
 
+    except SchedulerBusy as e:
+        raise busy_response(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
+# ---------- Streaming Chat (Server-Sent Events) ---------- #
+def sse_event(data, event=None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, session: Session = Depends(get_session)):
+    """
+    Stream Q&A / summary tokens as SSE `data: {"token": ...}` events, then one
+    `done` event; failures end the stream with an `error` event instead.
+    """
+    agent_type = detect_agent(request)
+    doc_ids = resolve_doc_ids(request.doc_ids, session, require_complete=agent_type in ("summarize", "ppt"))
+    priority = agent_type if agent_type in ("summarize", "ppt") else "qa"
+    if llm_client.scheduler.would_reject(priority):
+        # Reject before the 200 + event stream starts; cache hits would not have needed a slot,
+        # but a full queue means the server is saturated anyway
+        raise busy_response(SchedulerBusy(priority, llm_client.scheduler.max_queue[priority]))
+
+    async def events():
+        timings = {}
+        try:
+            if agent_type == "summarize":
+                agent_used = "Summarization Agent"
+                pdf_text = session_store.get_text(session, doc_ids)
+                tokens = summarization_agent.stream(request.message, pdf_text, timings=timings, doc_ids=doc_ids)
+            elif agent_type == "ppt":
+                # Decks are files, not token streams: reuse the regular endpoint and send one event
+                result = await chat(request, session)
+                yield sse_event({"response": result.response, "agent_used": result.agent_used}, event="done")
+                return
+            else:
+                agent_used = "PDF Q&A Agent"
+                tokens = pdf_qa_agent.stream(request.message, doc_ids=doc_ids, timings=timings,
+                                             filters=request.filters)
+
+            async for token in tokens:
+                yield sse_event({"token": token})
+
+            yield sse_event({
+                "agent_used": agent_used,
+                "cached": timings.get("cached"),
+                "ttft_ms": round(timings["ttft_s"] * 1000, 1) if "ttft_s" in timings else None,
+                "total_ms": round(timings["total_s"] * 1000, 1) if "total_s" in timings else None,
+                "tokens": timings.get("tokens"),
+                "context": timings.get("context"),
+            }, event="done")
+        except SchedulerBusy as e:
+            yield sse_event({"detail": str(e), "status": 429}, event="error")
+        except LLMUnavailable as e:
+            yield sse_event({"detail": str(e), "status": 503}, event="error")
+        except HTTPException as e:
+            yield sse_event({"detail": e.detail, "status": e.status_code}, event="error")
+        except Exception as e:
+            yield sse_event({"detail": f"Error processing chat: {e}"}, event="error")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 # ---------- Download PPT ---------- #
 @app.get("/download-ppt/{filename}")
 async def download_ppt(filename: str):
-    file_path = OUTPUT_DIR / filename
-    if not file_path.exists():
+    data = ppt_agent.deck_cache.get_file(filename)  # served from the in-memory deck cache when possible
+    if data is None:
         raise HTTPException(status_code=404, detail="PPT file not found")
-    return FileResponse(file_path, filename=filename)
+    return Response(
+        content=data,
+        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 # ---------- Reset System ---------- #
 @app.delete("/reset")
-async def reset():
-    global current_pdf_text, last_uploaded_file
-    current_pdf_text = ""
-    last_uploaded_file = None
-    faiss_store.reset()
+async def reset(session: Session = Depends(get_session)):
+    # Only this session's state: indexes are shared and managed by FAISSStore's memory budget
+    session_store.reset(session)
     return {"message": "System reset successfully 🧹"}
 
 # ---------- Run the Server ---------- #
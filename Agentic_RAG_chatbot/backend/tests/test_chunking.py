@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from backend.core.chunking import chunk_spans, materialize, sentence_boundaries, token_offsets
+
+SENTENCES = [f"Sentence number {i} has exactly seven tokens." for i in range(40)]
+TEXT = " ".join(SENTENCES)
+
+
+def n_tokens(text):
+    return len(token_offsets(text))
+
+
+def test_empty_text():
+    assert chunk_spans("") == []
+    assert chunk_spans("   \n ") == []
+
+
+def test_spans_respect_budget_and_cover_text():
+    spans = chunk_spans(TEXT, max_tokens=30, overlap_tokens=8)
+    chunks = materialize(TEXT, spans)
+    assert spans[0][0] == 0 and spans[-1][1] == len(TEXT)
+    assert all(n_tokens(c) <= 30 for c in chunks)
+    for (_, prev_end), (start, end) in zip(spans, spans[1:]):
+        assert start < prev_end < end  # consecutive chunks overlap and advance
+
+
+def test_chunks_end_on_sentence_boundaries():
+    chunks = materialize(TEXT, chunk_spans(TEXT, max_tokens=30, overlap_tokens=8))
+    assert all(c.endswith(".") for c in chunks)
+    # With an overlap of 8 tokens the next chunk starts at the last whole sentence inside it
+    assert all(c.startswith("Sentence number") for c in chunks)
+
+
+def test_without_sentence_awareness_chunks_fill_the_budget():
+    offsets = token_offsets(TEXT)
+    spans = chunk_spans(TEXT, max_tokens=30, overlap_tokens=0, sentence_aware=False)
+    assert [n_tokens(c) for c in materialize(TEXT, spans)[:-1]] == [30] * (len(offsets) // 30)
+    assert sum(n_tokens(c) for c in materialize(TEXT, spans)) == len(offsets)
+
+
+def test_sentence_longer_than_budget_is_split():
+    text = "word " * 100
+    spans = chunk_spans(text, max_tokens=16, overlap_tokens=4)
+    assert all(n_tokens(c) <= 16 for c in materialize(text, spans))
+    assert spans[-1][1] == len(text.rstrip())
+
+
+def test_overlap_must_be_smaller_than_budget():
+    with pytest.raises(ValueError):
+        chunk_spans(TEXT, max_tokens=8, overlap_tokens=8)
+
+
+def test_sentence_boundaries():
+    text = 'One two. "Three four!" Five\n\nsix'
+    offsets = token_offsets(text)
+    starts = [text[offsets[b, 0]:offsets[b, 1]] for b in sentence_boundaries(text, offsets)[:-1]]
+    assert starts == ["One", '"', "Five", "six"]
+
+
+class FastTokenizer:
+    """Offsets like a HuggingFace fast tokenizer, including zero-width special tokens."""
+
+    is_fast = True
+
+    def __call__(self, text, **kwargs):
+        spans = [(0, 0)] + [tuple(s) for s in token_offsets(text).tolist()] + [(len(text), len(text))]
+        return {"offset_mapping": spans}
+
+
+def test_fast_tokenizer_offsets_drop_empty_tokens():
+    offsets = token_offsets(TEXT, FastTokenizer())
+    np.testing.assert_array_equal(offsets, token_offsets(TEXT))
+    assert chunk_spans(TEXT, FastTokenizer(), max_tokens=30, overlap_tokens=8) == chunk_spans(
+        TEXT, max_tokens=30, overlap_tokens=8
+    )
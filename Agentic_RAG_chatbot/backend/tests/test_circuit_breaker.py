@@ -0,0 +1,71 @@
+import pytest
+
+from backend.core import circuit_breaker
+from backend.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(circuit_breaker.random, "uniform", lambda a, b: (a + b) / 2)  # no jitter
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=5.0)
+    breaker.record_failure("boom")
+    breaker.record_failure("boom")
+    breaker.record_success()  # resets the streak
+    breaker.record_failure("boom")
+    breaker.record_failure("boom")
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure("boom")
+    assert breaker.state == OPEN
+    assert not breaker.allow() and not breaker.would_allow()
+    assert breaker.retry_after() == 5.0
+    assert breaker.snapshot()["last_error"] == "boom"
+
+
+def test_single_half_open_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5.0)
+    breaker.record_failure()
+    clock[0] += 5.0
+
+    assert breaker.would_allow()
+    assert breaker.allow()  # claims the probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow() and not breaker.would_allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_doubles_open_period(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5.0, max_reset_timeout=12.0)
+    breaker.record_failure()
+    for expected in (10.0, 12.0, 12.0):
+        clock[0] += breaker.retry_after()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == expected
+    assert breaker.opened_count == 4
+
+
+def test_abandoned_probe_expires(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5.0, max_reset_timeout=60.0)
+    breaker.record_failure()
+    clock[0] += 5.0
+    assert breaker.allow()
+    clock[0] += 59.0
+    assert not breaker.allow()
+    clock[0] += 1.0
+    assert breaker.allow()  # the first probe's caller never reported back
+
+
+def test_backoff_is_capped():
+    for attempt in range(10):
+        assert 0.0 <= CircuitBreaker.backoff(attempt, base=0.25, cap=4.0) <= min(4.0, 0.25 * 2 ** attempt)
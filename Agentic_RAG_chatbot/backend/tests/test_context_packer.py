@@ -0,0 +1,43 @@
+from backend.core.context_packer import ContextPacker
+
+
+class FakeStore:
+    """Stands in for FAISSStore: documents of one-sentence chunks, counting decoded records."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.decoded = 0
+
+    def iter_chunks(self, doc_id):
+        for i, text in enumerate(self.docs.get(doc_id, [])):
+            self.decoded += 1
+            yield {"text": text, "page": 1, "start": 100 * i, "end": 100 * i + len(text)}
+
+    def get_vector(self, doc_id, chunk_id):
+        return None
+
+
+def test_pack_documents_reads_only_the_head():
+    store = FakeStore({"doc": [f"chunk number {i} of the document." for i in range(1000)]})
+    packed = ContextPacker(store).pack_documents(["doc"], max_tokens=40)
+
+    assert packed.text.startswith("chunk number 0")
+    assert packed.stats["packed_tokens"] <= 40
+    assert store.decoded == packed.stats["candidates"] < 10
+
+
+def test_pack_documents_falls_back_to_text():
+    packed = ContextPacker(FakeStore({})).pack_documents(["missing"], max_tokens=3, fallback_text="one two three four")
+    assert packed.text == "one two three"
+    assert packed.stats["saved_tokens"] == 1
+
+
+def test_pack_drops_overlapping_chunks():
+    hits = [
+        {"doc_id": "d", "chunk_id": 0, "text": "alpha beta gamma delta", "page": 1, "start": 0, "end": 22},
+        {"doc_id": "d", "chunk_id": 1, "text": "alpha beta gamma delta", "page": 1, "start": 0, "end": 22},
+        {"doc_id": "d", "chunk_id": 2, "text": "epsilon", "page": 2, "start": 0, "end": 7},
+    ]
+    packed = ContextPacker().pack(hits, max_tokens=100)
+    assert packed.text == "alpha beta gamma delta\n\nepsilon"
+    assert packed.stats["overlap_dropped"] == 1 and packed.stats["candidates"] == 3
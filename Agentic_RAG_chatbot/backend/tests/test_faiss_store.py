@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from backend.core.faiss_store import INDEX_TYPES, FAISSShard, build_index, index_type_of
+
+DIM = 64
+
+
+def random_vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+@pytest.mark.parametrize("n", [1, 5, 200])
+def test_build_index_small_corpus(index_type, n):
+    vectors = random_vectors(n)
+    index = build_index(vectors, index_type)
+    assert index_type_of(index) == index_type
+    assert index.ntotal == n
+
+
+def test_build_index_caps_nlist():
+    index = build_index(random_vectors(5), "ivf_flat", nlist=64)
+    assert index.nlist <= 5
+
+
+@pytest.mark.parametrize("index_type", ["ivf_pq", "pq", "ivf_flat"])
+def test_small_shard_search(tmp_path, index_type):
+    vectors = random_vectors(5)
+    shard = FAISSShard(str(tmp_path / "shard"), index_type=index_type)
+    shard.add_chunks([{"text": f"chunk {i}", "embedding": v} for i, v in enumerate(vectors)])
+
+    hits = shard.search(vectors[3], k=2)
+    assert hits[0]["text"] == "chunk 3"  # exact re-ranking recovers the nearest neighbour
+    assert index_type_of(shard.index) == index_type
+    shard.close()
+
+
+def test_small_ivf_pq_shard_retrains_after_growth(tmp_path):
+    shard = FAISSShard(str(tmp_path / "shard"), index_type="ivf_pq")
+    shard.add_chunks([{"text": f"chunk {i}", "embedding": v} for i, v in enumerate(random_vectors(5))])
+    assert shard.index.ntotal == 5
+
+    shard.add_chunks([{"text": f"more {i}", "embedding": v} for i, v in enumerate(random_vectors(300, seed=1))])
+    assert shard.index.ntotal == 305
+    assert shard._trained_on == 305
+    shard.close()
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_filtered_search(tmp_path, index_type):
+    vectors = random_vectors(300)
+    shard = FAISSShard(str(tmp_path / "shard"), index_type=index_type)
+    shard.add_chunks([{"text": f"chunk {i}", "page": i % 10, "embedding": v} for i, v in enumerate(vectors)])
+
+    hits = shard.search_batch(vectors[:5], k=4, filters={"page": [3, 7]}, nprobe=64, ef_search=128)
+    for query_hits in hits:
+        assert len(query_hits) == 4
+        assert all(hit.metadata["page"] in (3, 7) for hit in query_hits)
+    assert hits[3][0].chunk_id == 3  # an allowed query vector is its own nearest neighbour
+    assert shard.search_batch(vectors[:1], k=4, filters={"page": 99})[0] == []
+    shard.close()
+
+
+def test_lexical_search_filters(tmp_path):
+    from backend.core.faiss_store import FAISSStore
+
+    store = FAISSStore(str(tmp_path / "index"))
+    store.begin_document("doc")
+    vectors = random_vectors(4)
+    store.append_chunks("doc", [{"text": f"energy evidence part {i}", "page": i, "embedding": v}
+                                for i, v in enumerate(vectors)])
+    store.finalize_document("doc", "text")
+
+    hits = store.lexical_search("energy evidence", k=3, doc_ids=["doc"], filters={"page": 2})
+    assert [hit.chunk_id for hit in hits] == [2]
+    assert len(store.lexical_search("energy evidence", k=3, doc_ids=["doc"])) == 3
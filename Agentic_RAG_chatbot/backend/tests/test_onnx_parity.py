@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("transformers")
+pytest.importorskip("sentence_transformers")
+
+from backend.core.onnx_export import DEFAULT_DIR, PARITY_THRESHOLDS, check_parity  # noqa: E402
+
+MODEL_DIR = os.getenv("ONNX_MODEL_DIR", DEFAULT_DIR)
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(os.path.join(MODEL_DIR, "model.onnx")),
+    reason=f"no ONNX export in {MODEL_DIR} (run `python -m backend.core.onnx_export`)",
+)
+
+
+@pytest.fixture(scope="module")
+def parity():
+    try:
+        return check_parity(MODEL_DIR)
+    except OSError as e:  # reference model not downloadable (offline)
+        pytest.skip(f"PyTorch reference model unavailable: {e}")
+
+
+@pytest.mark.parametrize("variant", sorted(PARITY_THRESHOLDS))
+def test_onnx_matches_pytorch(parity, variant):
+    min_cos, mean_cos, passed = parity[variant]
+    assert passed, f"{variant}: min cosine {min_cos:.5f} < {PARITY_THRESHOLDS[variant]} (mean {mean_cos:.5f})"
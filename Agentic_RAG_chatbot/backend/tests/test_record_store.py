@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.core.record_store import RecordStore
+
+
+def records(n, start=0):
+    return [{"text": f"record {i}", "page": i} for i in range(start, start + n)]
+
+
+def vectors(n, dim=4, start=0):
+    return np.arange(start * dim, (start + n) * dim, dtype="float32").reshape(n, dim)
+
+
+def test_append_and_reopen(tmp_path):
+    store = RecordStore(str(tmp_path))
+    store.append(records(3), vectors(3))
+    store.append(records(2, start=3), vectors(2, start=3))
+    store.close()
+
+    reopened = RecordStore(str(tmp_path))
+    assert len(reopened) == 5
+    assert reopened.get(4) == {"text": "record 4", "page": 4}
+    assert [r["page"] for r in reopened.iter_records()] == [0, 1, 2, 3, 4]
+    np.testing.assert_array_equal(reopened.vectors(), vectors(5))
+    with pytest.raises(IndexError):
+        reopened.get(5)
+    reopened.close()
+
+
+def test_torn_append_is_truncated_on_open(tmp_path):
+    store = RecordStore(str(tmp_path))
+    store.append(records(2), vectors(2))
+    store.close()
+    sizes = {f: os.path.getsize(f) for f in (store.log_file, store.idx_file, store.vec_file)}
+
+    # A crash mid-append: bytes past the committed end of every file, manifest untouched
+    for file in sizes:
+        with open(file, "ab") as f:
+            f.write(b"\xff" * 13)
+
+    reopened = RecordStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert {f: os.path.getsize(f) for f in sizes} == sizes
+    reopened.append(records(1, start=2), vectors(1, start=2))
+    assert reopened.get(2) == {"text": "record 2", "page": 2}
+    np.testing.assert_array_equal(reopened.vectors(), vectors(3))
+    reopened.close()
+
+
+def test_append_without_manifest_commit_is_invisible(tmp_path, monkeypatch):
+    store = RecordStore(str(tmp_path))
+    store.append(records(2), vectors(2))
+
+    def crash():
+        raise OSError("power loss")
+
+    monkeypatch.setattr(store, "_write_manifest", crash)
+    with pytest.raises(OSError):
+        store.append(records(5, start=2), vectors(5, start=2))
+    store.close()
+
+    reopened = RecordStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert [r["page"] for r in reopened.iter_records()] == [0, 1]
+    reopened.close()
+
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    store = RecordStore(str(tmp_path))
+    store.append(records(2), vectors(2, dim=4))
+    with pytest.raises(ValueError, match="dimension"):
+        store.append(records(1), vectors(1, dim=8))
+    assert len(store) == 2 and store.dim == 4
+    store.close()
+
+
+def test_reset(tmp_path):
+    store = RecordStore(str(tmp_path))
+    store.append(records(3), vectors(3))
+    store.reset()
+    assert len(store) == 0 and store.vectors().shape == (0, 0)
+    assert not os.path.exists(store.manifest_file)
+
+    store.append(records(1), vectors(1, dim=8))  # a new dimension is accepted after reset
+    store.close()
+    reopened = RecordStore(str(tmp_path))
+    assert len(reopened) == 1 and reopened.dim == 8
+    reopened.close()
+
+
+def test_empty_append_is_a_no_op(tmp_path):
+    store = RecordStore(str(tmp_path))
+    store.append([], np.zeros((0, 4), dtype="float32"))
+    assert len(store) == 0 and store.dim is None
+    store.close()
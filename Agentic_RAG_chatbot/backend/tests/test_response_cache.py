@@ -0,0 +1,82 @@
+import pytest
+
+from backend.core import response_cache
+from backend.core.response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"), **kwargs)
+
+
+def test_memory_then_disk_hits(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("k", "answer")
+    assert cache.get("k") == "answer"
+    assert cache.stats["memory_hits"] == 1
+    cache.close()
+
+    reopened = make_cache(tmp_path)  # fresh memory tier: served from SQLite, then promoted
+    assert reopened.get("k") == "answer"
+    assert reopened.get("k") == "answer"
+    assert reopened.stats["disk_hits"] == 1 and reopened.stats["memory_hits"] == 1
+    assert reopened.get("missing") is None and reopened.stats["misses"] == 1
+    reopened.close()
+
+
+def test_entries_expire(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.put("default", "a")
+    cache.put("short", "b", ttl_seconds=10)
+    clock[0] += 30
+    assert cache.get("short") is None
+    assert cache.get("default") == "a"
+    cache.close()
+
+    clock[0] += 60
+    reopened = make_cache(tmp_path, ttl_seconds=60)
+    assert reopened.get("default") is None  # expired on disk: deleted on read
+    assert reopened.stats["expired"] == 1
+    reopened.close()
+
+
+def test_memory_tier_evicts_least_recent(tmp_path):
+    value = "x" * 100
+    cache = make_cache(tmp_path, max_memory_bytes=3 * (1 + len(value) + ResponseCache._ENTRY_OVERHEAD))
+    for key in "abc":
+        cache.put(key, value)
+    cache.get("a")  # a becomes most recent
+    cache.put("d", value)
+    assert cache.stats["memory_evictions"] == 1
+    assert cache.snapshot()["memory_entries"] == 3
+    cache.get("b")  # evicted from memory, still on disk
+    assert cache.stats["disk_hits"] == 1
+    cache.close()
+
+
+def test_disk_tier_drops_oldest_beyond_limit(tmp_path, clock):
+    cache = make_cache(tmp_path, max_disk_entries=50, max_memory_bytes=0)
+    for i in range(100):  # the purge runs every 100 puts
+        clock[0] += 1
+        cache.put(f"k{i}", "v")
+    assert cache.stats["disk_evictions"] == 50
+    assert cache.get("k0") is None
+    assert cache.get("k99") == "v"
+    cache.close()
+
+
+def test_namespaces_are_isolated(tmp_path):
+    a = make_cache(tmp_path, namespace="model-a")
+    b = make_cache(tmp_path, namespace="model-b")
+    a.put("k", "from a")
+    assert b.get("k") is None
+    b.clear()
+    assert a.get("k") == "from a"
+    a.close()
+    b.close()
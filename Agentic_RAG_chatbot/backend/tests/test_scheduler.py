@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from backend.core.scheduler import LLMScheduler, SchedulerBusy
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_freed_slot_goes_to_highest_priority_waiter():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrent=1)
+        order = []
+
+        async def job(name, priority):
+            async with scheduler.slot(priority):
+                order.append(name)
+
+        await scheduler.acquire("qa")
+        tasks = [asyncio.create_task(job(name, p)) for name, p in
+                 (("ppt", "ppt"), ("summary", "summarize"), ("qa-1", "qa"), ("qa-2", "qa"))]
+        await settle()
+        assert order == [] and scheduler.running == 1
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return scheduler, order
+
+    scheduler, order = asyncio.run(scenario())
+    assert order == ["qa-1", "qa-2", "summary", "ppt"]
+    assert scheduler.running == 0
+    assert scheduler.snapshot()["classes"]["qa"]["admitted"] == 3
+
+
+def test_full_queue_rejects_immediately():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrent=1, max_queue={"ppt": 1})
+        await scheduler.acquire("qa")
+        assert not scheduler.would_reject("ppt")
+        waiter = asyncio.create_task(scheduler.acquire("ppt"))
+        await settle()
+
+        assert scheduler.would_reject("ppt")
+        assert not scheduler.would_reject("qa")
+        with pytest.raises(SchedulerBusy) as busy:
+            await scheduler.acquire("ppt")
+        assert busy.value.priority == "ppt" and busy.value.depth == 1
+
+        scheduler.release()
+        await waiter
+        scheduler.release()
+        return scheduler.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["running"] == 0
+    ppt = snapshot["classes"]["ppt"]
+    assert (ppt["admitted"], ppt["rejected"], ppt["waiting"]) == (1, 1, 0)
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrent=1)
+        await scheduler.acquire("qa")
+        cancelled = asyncio.create_task(scheduler.acquire("qa"))
+        survivor = asyncio.create_task(scheduler.acquire("summarize"))
+        await settle()
+
+        cancelled.cancel()
+        await settle()
+        assert scheduler.snapshot()["classes"]["qa"]["waiting"] == 0
+
+        scheduler.release()
+        await survivor
+        assert scheduler.running == 1
+        scheduler.release()
+        return scheduler.running
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_unknown_priority():
+    scheduler = LLMScheduler()
+    with pytest.raises(ValueError):
+        scheduler.would_reject("bulk")
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.acquire("bulk"))
@@ -0,0 +1,83 @@
+import numpy as np
+
+from backend.core.semantic_cache import SemanticCache
+
+DIM = 32
+
+
+def unit(seed):
+    v = np.random.default_rng(seed).standard_normal(DIM).astype("float32")
+    return v / np.linalg.norm(v)
+
+
+def near(v, eps, seed=100):
+    """A vector at cosine similarity ~1 - eps^2 / 2 to v."""
+    w = v + eps * unit(seed)
+    return w / np.linalg.norm(w)
+
+
+def test_hit_requires_threshold(tmp_path):
+    cache = SemanticCache(str(tmp_path), threshold=0.95)
+    key = SemanticCache.partition_key("model", "system", ["doc"])
+    v = unit(0)
+    cache.insert(key, v, "answer", latency_s=1.5)
+
+    assert cache.lookup(key, v) == "answer"
+    assert cache.lookup(key, near(v, 0.1)) == "answer"  # cos ~0.995
+    assert cache.lookup(key, near(v, 1.0)) is None  # cos ~0.5
+    assert cache.lookup(key, unit(1)) is None
+    assert cache.stats["hits"] == 2 and cache.stats["lookups"] == 4
+    assert cache.snapshot()["saved_s"] == 3.0
+    cache.close()
+
+
+def test_scaled_query_matches(tmp_path):
+    cache = SemanticCache(str(tmp_path))
+    key = SemanticCache.partition_key("model")
+    cache.insert(key, unit(0), "answer")
+    assert cache.lookup(key, 7 * unit(0)) == "answer"  # vectors are L2-normalized
+    cache.close()
+
+
+def test_partitions_are_isolated(tmp_path):
+    cache = SemanticCache(str(tmp_path))
+    v = unit(0)
+    scoped = SemanticCache.partition_key("model", "system", ["a", "b"])
+    cache.insert(scoped, v, "answer")
+
+    assert SemanticCache.partition_key("model", "system", ["b", "a"]) == scoped  # order-insensitive scope
+    assert cache.lookup(scoped, v) == "answer"
+    for other in (SemanticCache.partition_key("model", "system", ["a"]),
+                  SemanticCache.partition_key("model", "other system", ["a", "b"]),
+                  SemanticCache.partition_key("other model", "system", ["a", "b"]),
+                  SemanticCache.partition_key("model", "system")):
+        assert cache.lookup(other, v) is None
+    cache.close()
+
+
+def test_insert_trims_oldest(tmp_path):
+    cache = SemanticCache(str(tmp_path), max_entries=8)
+    key = SemanticCache.partition_key("model")
+    vectors = [unit(i) for i in range(9)]
+    for i, v in enumerate(vectors):
+        cache.insert(key, v, f"answer {i}")
+
+    # Overflowing 8 entries keeps the newest 3/4 * 8 = 6
+    assert cache.stats["evictions"] == 3
+    assert cache.lookup(key, vectors[0]) is None
+    assert cache.lookup(key, vectors[8]) == "answer 8"
+    assert cache.lookup(key, vectors[3]) == "answer 3"
+    cache.close()
+
+
+def test_partitions_survive_reopen(tmp_path):
+    key = SemanticCache.partition_key("model")
+    cache = SemanticCache(str(tmp_path), max_open_partitions=1)
+    cache.insert(key, unit(0), "answer")
+    cache.insert(SemanticCache.partition_key("other"), unit(1), "other")  # closes the first partition
+    assert cache.snapshot()["open_partitions"] == 1
+    cache.close()
+
+    reopened = SemanticCache(str(tmp_path))
+    assert reopened.lookup(key, unit(0)) == "answer"
+    reopened.close()
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from backend.core.pdf_utils import PdfUpload, UploadTooLarge
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 9000 + b"\n%%EOF"  # ~2.3 MB, spans several copy batches
+
+
+def test_pdf_upload_hashes_while_writing(tmp_path):
+    upload = PdfUpload(str(tmp_path))
+    for i in range(0, len(PDF), 4096):
+        upload.write(PDF[i:i + 4096])
+    doc_id, path = upload.finish()
+    assert doc_id == hashlib.sha256(PDF).hexdigest()
+    assert upload.size == len(PDF)
+    with open(path, "rb") as f:
+        assert f.read() == PDF
+
+
+def test_pdf_upload_over_limit_removes_partial_file(tmp_path):
+    upload = PdfUpload(str(tmp_path), max_bytes=1000)
+    upload.write(b"x" * 1000)
+    with pytest.raises(UploadTooLarge):
+        upload.write(b"x")
+    assert os.listdir(tmp_path) == []
+
+
+# -------------------- receive_pdf (needs the full backend) -------------------- #
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "outputs").mkdir()  # mounted at import time
+    from backend import main
+
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    return main
+
+
+def post(server, files=None, data=None, content=None, headers=None):
+    import httpx
+    from fastapi import FastAPI, Request
+
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        filename, doc_id, tmp_path = await server.receive_pdf(request)
+        with open(tmp_path, "rb") as f:
+            body = f.read()
+        os.remove(tmp_path)
+        return {"filename": filename, "doc_id": doc_id, "size": len(body), "intact": body == PDF}
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/upload", files=files, data=data, content=content, headers=headers)
+
+    return asyncio.run(send())
+
+
+def test_receive_pdf_streams_file_part(server, tmp_path):
+    res = post(server, data={"note": "ignored"}, files={"file": ("paper.pdf", PDF, "application/pdf")})
+    assert res.status_code == 200
+    assert res.json() == {"filename": "paper.pdf", "doc_id": hashlib.sha256(PDF).hexdigest(),
+                          "size": len(PDF), "intact": True}
+    assert [f for f in os.listdir(tmp_path) if f.endswith(".part")] == []
+
+
+@pytest.mark.parametrize("kwargs, status", [
+    ({"files": {"file": ("notes.txt", b"hello", "text/plain")}}, 400),
+    ({"files": {"other": ("paper.pdf", PDF, "application/pdf")}}, 400),
+    ({"content": PDF, "headers": {"content-type": "application/pdf"}}, 400),
+    ({"content": b"--xyz\r\nbroken", "headers": {"content-type": "multipart/form-data; boundary=xyz"}}, 400),
+])
+def test_receive_pdf_rejects_bad_uploads(server, tmp_path, kwargs, status):
+    assert post(server, **kwargs).status_code == status
+    assert [f for f in os.listdir(tmp_path) if f.endswith(".part")] == []
+
+
+def test_receive_pdf_enforces_size_limit(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "MAX_UPLOAD_BYTES", 1024 * 1024)
+    res = post(server, files={"file": ("paper.pdf", PDF, "application/pdf")})
+    assert res.status_code == 413
+    assert [f for f in os.listdir(tmp_path) if f.endswith(".part")] == []
+
+
+def test_size_guard_response_has_cors_headers(server, monkeypatch):
+    import httpx
+
+    monkeypatch.setattr(server, "MAX_UPLOAD_BYTES", 1024)
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+            return await client.post(server.UPLOAD_PATH, files={"file": ("paper.pdf", PDF, "application/pdf")},
+                                     headers={"origin": "http://localhost:5173"})
+
+    res = asyncio.run(send())
+    assert res.status_code == 413
+    assert res.headers["access-control-allow-origin"] == "http://localhost:5173"
@@ -1,5 +1,6 @@
 import React, { useState } from "react";
 import FileUploader from "./components/FileUploader";
+import { apiFetch } from "./api";
 import ChatUI from "./components/ChatUI";
 import AgentSelector from "./components/AgentSelector";
 import Lottie from "lottie-react";
@@ -18,7 +19,7 @@ function App() {
 
   const handleReset = async () => {
     try {
-      const response = await fetch("http://localhost:8000/reset", {
+      const response = await apiFetch("/reset", {
         method: "DELETE",
       });
       if (response.ok) {
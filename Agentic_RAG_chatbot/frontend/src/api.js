@@ -0,0 +1,15 @@
+export const API_URL = "http://localhost:8000";
+
+const SESSION_KEY = "rag_session_id";
+
+// fetch() against the backend, carrying this tab's session id in the X-Session-Id header
+export async function apiFetch(path, options = {}) {
+  const headers = { ...(options.headers || {}) };
+  const sessionId = sessionStorage.getItem(SESSION_KEY);
+  if (sessionId) headers["X-Session-Id"] = sessionId;
+
+  const response = await fetch(`${API_URL}${path}`, { ...options, headers });
+  const returnedId = response.headers.get("X-Session-Id");
+  if (returnedId) sessionStorage.setItem(SESSION_KEY, returnedId);
+  return response;
+}
@@ -1,4 +1,5 @@
 import React, { useState } from "react";
+import { apiFetch } from "../api";
 
 function ChatUI({ selectedAgent }) {
   const [messages, setMessages] = useState([]);
@@ -18,7 +19,7 @@ function ChatUI({ selectedAgent }) {
     setLoading(true);
 
     try {
-      const response = await fetch("http://localhost:8000/chat", {
+      const response = await apiFetch("/chat", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
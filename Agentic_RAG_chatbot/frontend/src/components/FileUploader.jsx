@@ -1,37 +1,73 @@
 import React, { useState } from "react";
+import { apiFetch } from "../api";
+
+const POLL_INTERVAL_MS = 500;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Poll an ingestion job (202 + status_url from /upload-pdf) until it is done or failed
+async function waitForIngestion(statusUrl, onProgress) {
+  for (;;) {
+    const res = await apiFetch(statusUrl);
+    const job = await res.json();
+    if (!res.ok) throw new Error(job.detail || "Could not check processing status");
+    if (job.status === "done") return job;
+    if (job.status === "failed") throw new Error(job.error || "Processing failed");
+    onProgress(job);
+    await sleep(POLL_INTERVAL_MS);
+  }
+}
 
 function FileUploader({ onUploadSuccess }) {
   const [uploading, setUploading] = useState(false);
+  const [progress, setProgress] = useState(null);
+  const [error, setError] = useState(null);
 
   const handleUpload = async (event) => {
     const file = event.target.files[0];
+    event.target.value = ""; // allow re-selecting the same file after an error
     if (!file) return;
 
     const formData = new FormData();
     formData.append("file", file);
 
     setUploading(true);
+    setProgress(null);
+    setError(null);
 
     try {
-      const res = await fetch("http://localhost:8000/upload-pdf", {
+      const res = await apiFetch("/upload-pdf", {
         method: "POST",
         body: formData,
       });
       const data = await res.json();
-      onUploadSuccess(data);
+      if (!res.ok) throw new Error(data.detail || "Upload failed");
+
+      // 202: the PDF is still being indexed; summaries and slides need the finished document
+      if (res.status === 202 && data.status_url) {
+        setProgress("Processing...");
+        await waitForIngestion(data.status_url, (job) => {
+          const pages = job.stages?.extract?.items || 0;
+          setProgress(pages ? `Processing... ${pages} pages read` : "Processing...");
+        });
+      }
+      onUploadSuccess({ ...data, status: "done" });
     } catch (error) {
       console.error("Error uploading:", error);
+      setError(error.message);
     } finally {
       setUploading(false);
+      setProgress(null);
     }
   };
 
   return (
     <div className="text-center py-8">
       <label className="cursor-pointer bg-gradient-to-r from-blue-500 to-indigo-600 text-white px-6 py-3 rounded-xl shadow-md font-semibold hover:scale-105 transition">
-        {uploading ? "Uploading..." : "Upload PDF"}
-        <input type="file" accept="application/pdf" hidden onChange={handleUpload} />
+        {progress || (uploading ? "Uploading..." : "Upload PDF")}
+        <input type="file" accept="application/pdf" hidden disabled={uploading} onChange={handleUpload} />
       </label>
+      {error && <p className="mt-4 text-red-500">{error}</p>}
     </div>
   );
 }
@@ -8,11 +8,12 @@ def initialize_qa_model():
 
 # Extract text from a PDF file
 def extract_text_from_pdf(pdf_file):
-    text = ""
+    parts = []
     with pdfplumber.open(pdf_file) as pdf:
         for page in pdf.pages:
-            text += page.extract_text() or ""
-    return text
+            parts.append(page.extract_text() or "")
+            page.flush_cache()  # release each page's parsed objects once its text is out
+    return "".join(parts)
 
 # Ask a question based on the extracted text
 def ask_question(qa_pipeline, context, question):